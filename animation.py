@@ -0,0 +1,52 @@
+# Sistema de animação com um relógio único. Cada clipe (lista de frames e
+# tempo entre frames) é registrado uma vez, e cada objeto só guarda qual clipe
+# usa e uma defasagem (fase). O frame atual é calculado a partir do relógio do
+# jogo, então nenhum objeto precisa de temporizador próprio: o frame só é
+# calculado (e a imagem do ator só muda) quando o objeto vai ser desenhado ou
+# testado numa colisão.
+
+CLIPS = {} # Nome -> clipe registrado
+
+
+# Classe de um clipe de animação
+class Clip:
+    def __init__(self, name, frames, delay):
+        self.name = name
+        self.frames = frames # Nomes das imagens de cada frame
+        self.delay = delay # Tempo entre frames
+
+    # Devolve a imagem do clipe em um instante do relógio
+    def frame_at(self, time):
+        return self.frames[int(time / self.delay) % len(self.frames)]
+
+
+# Função que registra um clipe pelo nome (registrar de novo devolve o mesmo clipe)
+def register_clip(name, frames, delay):
+    clip = CLIPS.get(name)
+    if clip is None:
+        clip = CLIPS[name] = Clip(name, frames, delay)
+    return clip
+
+
+# Classe que liga um ator a um clipe, com uma fase própria
+class Animation:
+    def __init__(self, clip, phase=0):
+        self.clip = clip
+        self.phase = phase # Defasagem em segundos em relação ao relógio
+
+    # Devolve a imagem que o ator deve mostrar em um instante do relógio
+    def frame_at(self, time):
+        return self.clip.frame_at(time + self.phase)
+
+    # Atualiza a imagem do ator (o Actor só recalcula o tamanho se o frame mudou)
+    def apply(self, actor, time):
+        actor.image = self.clip.frame_at(time + self.phase)
+
+
+# Classe do relógio único das animações
+class AnimationClock:
+    def __init__(self):
+        self.time = 0
+
+    def advance(self, dt):
+        self.time += dt
@@ -0,0 +1,125 @@
+import json
+import os
+import sys
+
+# Atlas de sprites. Todos os frames dos personagens, inimigos, moedas e
+# plataformas são juntados em uma única imagem (images/atlas.png) na hora de
+# montar o jogo, com a posição de cada frame em images/atlas.json. As versões
+# espelhadas (os frames "_flip") não são mais guardadas em disco: são geradas
+# uma vez ao carregar o atlas. Cada frame tem um número (índice), e o desenho
+# usa esse número para pegar a superfície já pronta, sem procurar pelo nome.
+# As máscaras de colisão dos frames (collision.py) são geradas junto.
+#
+# Para montar o atlas de novo depois de mudar as imagens:
+#   python atlas.py
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+ATLAS_IMAGE = os.path.join(IMAGES_DIR, 'atlas.png')
+ATLAS_DATA = os.path.join(IMAGES_DIR, 'atlas.json')
+
+FLIPPED_PREFIXES = ('hero_', 'flying_enemy_') # Frames que também têm versão espelhada
+EXCLUDED_PREFIXES = ('bg_', 'cloud', 'atlas') # Imagens de fundo ficam fora do atlas
+ATLAS_WIDTH = 512 # Largura da imagem do atlas
+PADDING = 1 # Espaço entre os frames
+
+# Metadados do atlas (lidos do JSON, sem decodificar a imagem)
+FRAME_NAMES = [] # Índice -> nome do frame (os espelhados vêm depois dos normais)
+FRAME_INDEX = {} # Nome do frame -> índice
+FRAME_RECTS = [] # Índice -> (x, y, largura, altura) no atlas
+FRAME_FLIPPED = [] # Índice -> se o frame é espelhado
+
+
+# Função que lê o atlas.json e preenche as tabelas de frames
+def load_metadata(path=ATLAS_DATA):
+    FRAME_NAMES.clear()
+    FRAME_INDEX.clear()
+    FRAME_RECTS.clear()
+    FRAME_FLIPPED.clear()
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    for name, rect in data['frames'].items():
+        FRAME_NAMES.append(name)
+        FRAME_RECTS.append(tuple(rect))
+        FRAME_FLIPPED.append(False)
+    for name in data['flipped']:
+        FRAME_NAMES.append(name + '_flip')
+        FRAME_RECTS.append(tuple(data['frames'][name]))
+        FRAME_FLIPPED.append(True)
+    for i, name in enumerate(FRAME_NAMES):
+        FRAME_INDEX[name] = i
+
+
+# Função que devolve o índice de um frame pelo nome (None se não estiver no atlas)
+def frame_index(name):
+    return FRAME_INDEX.get(name)
+
+
+# Classe com as superfícies de todos os frames, já recortadas e espelhadas
+# (sheet recebe a imagem do atlas já lida, sem converter)
+class Atlas:
+    def __init__(self, path=ATLAS_IMAGE, sheet=None):
+        import pygame
+        if sheet is None:
+            sheet = pygame.image.load(path)
+        sheet = sheet.convert_alpha()
+        self.frames = [] # Índice -> superfície pronta para desenhar
+        for rect, flipped in zip(FRAME_RECTS, FRAME_FLIPPED):
+            frame = sheet.subsurface(rect)
+            if flipped:
+                frame = pygame.transform.flip(frame, True, False)
+            self.frames.append(frame)
+
+    # Devolve a superfície de um frame pelo nome
+    def surface(self, name):
+        return self.frames[FRAME_INDEX[name]]
+
+
+# Função que monta o atlas a partir das imagens soltas da pasta images/
+def build(images_dir=IMAGES_DIR):
+    import pygame
+    names = sorted(
+        f[:-4] for f in os.listdir(images_dir)
+        if f.endswith('.png') and not f.endswith('_flip.png') and not f.startswith(EXCLUDED_PREFIXES)
+    )
+    images = {name: pygame.image.load(os.path.join(images_dir, name + '.png')) for name in names}
+
+    # Empacotamento em prateleiras: do frame mais alto para o mais baixo,
+    # da esquerda para a direita, abrindo uma prateleira nova quando não cabe
+    rects = {}
+    x = y = shelf_height = 0
+    for name in sorted(names, key=lambda n: (-images[n].get_height(), n)):
+        width, height = images[name].get_size()
+        if x + width > ATLAS_WIDTH:
+            x = 0
+            y += shelf_height + PADDING
+            shelf_height = 0
+        rects[name] = (x, y, width, height)
+        x += width + PADDING
+        shelf_height = max(shelf_height, height)
+
+    sheet = pygame.Surface((ATLAS_WIDTH, y + shelf_height), pygame.SRCALPHA)
+    sheet.fill((0, 0, 0, 0))
+    for name, rect in rects.items():
+        # Soma sobre o fundo zerado copia os pixels exatamente (sem misturar o alfa)
+        sheet.blit(images[name], rect[:2], special_flags=pygame.BLEND_RGBA_ADD)
+    pygame.image.save(sheet, os.path.join(images_dir, 'atlas.png'))
+
+    # Um frame por linha, para as mudanças no atlas ficarem fáceis de ler
+    frames = ',\n'.join(f'  {json.dumps(name)}: {json.dumps(list(rects[name]))}' for name in names)
+    flipped = json.dumps([name for name in names if name.startswith(FLIPPED_PREFIXES)])
+    with open(os.path.join(images_dir, 'atlas.json'), 'w', encoding='utf-8') as f:
+        f.write('{\n "frames": {\n' + frames + '\n },\n "flipped": ' + flipped + '\n}\n')
+    load_metadata(os.path.join(images_dir, 'atlas.json'))
+
+    # Máscaras de colisão de cada frame, geradas da mesma imagem
+    from collision import save_masks
+    save_masks(sheet, os.path.join(images_dir, 'atlas_masks.json'))
+
+
+load_metadata()
+
+
+if __name__ == '__main__':
+    build(sys.argv[1] if len(sys.argv) > 1 else IMAGES_DIR)
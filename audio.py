@@ -0,0 +1,94 @@
+import os
+
+# Efeitos sonoros. Todos os sons da pasta sounds/ são decodificados uma vez,
+# quando o jogo abre, e tocados em um grupo fixo de canais do mixer
+# reservados só para eles (a música e outros sons não disputam esses canais).
+# Os pedidos de um quadro são juntados: várias moedas pegas no mesmo quadro
+# tocam o som uma vez só. Sons que não existem (como 'victory') são avisados
+# uma única vez e depois ignorados com uma consulta no dicionário, sem
+# exceções a cada pedido.
+
+SOUNDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sounds')
+EXTENSIONS = ('.ogg', '.wav') # Formatos carregados
+CHANNELS = 8 # Canais reservados para os efeitos
+
+
+# Função que lista os arquivos de efeitos da pasta (nome -> caminho)
+def sound_files(sounds_dir=SOUNDS_DIR):
+    files = {}
+    for filename in sorted(os.listdir(sounds_dir)):
+        name, extension = os.path.splitext(filename)
+        if extension in EXTENSIONS and name not in files:
+            files[name] = os.path.join(sounds_dir, filename)
+    return files
+
+
+# Classe que carrega e toca os efeitos sonoros. buffers recebe sons já
+# decodificados (pelo carregamento em segundo plano); sem ele, os arquivos
+# da pasta são decodificados aqui.
+class SoundEffects:
+    def __init__(self, sounds_dir=SOUNDS_DIR, channels=CHANNELS, buffers=None):
+        import pygame
+        self.buffers = {} # Nome -> som já decodificado
+        self.missing = set() # Sons pedidos que não existem (já avisados)
+        self.pending = {} # Sons pedidos neste quadro, sem repetição, na ordem do pedido
+        self.channels = [] # Canais reservados
+        self.next_channel = 0 # Próximo canal na fila (o que começou a tocar há mais tempo)
+
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), channels))
+            pygame.mixer.set_reserved(channels) # Sound.play() comum não usa estes canais
+            self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        except pygame.error as e:
+            print(f"Could not open audio device: {e}")
+            return
+
+        if buffers is None:
+            buffers = {}
+            for name, path in sound_files(sounds_dir).items():
+                try:
+                    buffers[name] = pygame.mixer.Sound(path)
+                except pygame.error:
+                    # Arquivo corrompido: o som fica como se não existisse
+                    self.missing.add(name)
+                    print(f"Could not decode sound: {name}")
+        for name, sound in buffers.items():
+            # Um som que decodificou vazio não pode ir para um canal fixo
+            # (o pygame falha ao tocar); fica como se não existisse
+            if sound.get_length() > 0:
+                self.buffers[name] = sound
+            else:
+                self.missing.add(name)
+                print(f"Could not decode sound: {name}")
+
+    # Pede um efeito sonoro; ele toca no fim do quadro, em flush()
+    def play(self, name):
+        sound = self.buffers.get(name)
+        if sound is None:
+            if self.channels and name not in self.missing:
+                self.missing.add(name)
+                print(f"Sound not found: {name}")
+            return
+        self.pending[name] = sound
+
+    # Toca os efeitos pedidos no quadro (chamado uma vez por quadro)
+    def flush(self):
+        if not self.pending:
+            return
+        for sound in self.pending.values():
+            self.free_channel().play(sound)
+        self.pending.clear()
+
+    # Devolve um canal livre, procurando a partir do próximo da fila. Se todos
+    # estiverem tocando, usa o que começou há mais tempo.
+    def free_channel(self):
+        count = len(self.channels)
+        index = self.next_channel
+        for offset in range(count):
+            if not self.channels[(self.next_channel + offset) % count].get_busy():
+                index = (self.next_channel + offset) % count
+                break
+        self.next_channel = (index + 1) % count
+        return self.channels[index]
@@ -0,0 +1,210 @@
+# Motor em lote (estrutura de arrays) para fases com milhares de inimigos e
+# plataformas móveis. Em vez de cada objeto se atualizar no próprio método
+# update, posições, direções, alcances e fases ficam em arrays do NumPy e são
+# atualizados todos de uma vez. Os objetos (e os atores) só recebem os valores
+# novos quando precisam: ao mudar de célula no índice espacial, ao serem
+# candidatos a uma colisão ou na hora de desenhar. As animações não passam por
+# aqui: elas vêm do relógio único (animation.py).
+
+try:
+    import numpy as np
+except ImportError: # NumPy é opcional: sem ele o jogo usa o update de cada objeto
+    np = None
+
+from simulation import image_size, ENEMY_IDLE, FLYER_LEFT, FLYER_RIGHT
+
+
+# Função que move patrulheiros e inverte a direção de quem passou do alcance
+# (mesma regra de Enemy.update e FlyingEnemy.update)
+def patrol(x, start_x, direction, speed, patrol_range, active, dt):
+    new_x = x + direction * speed * dt
+    turn = active & (np.abs(new_x - start_x) > patrol_range)
+    direction[turn] *= -1
+    np.copyto(x, new_x, where=active & ~turn)
+
+
+# Função que calcula as células do índice espacial ocupadas por cada retângulo
+def cell_ranges(x, y, width, height, cell_size):
+    left = x - width / 2
+    top = y - height / 2
+    return np.stack([
+        np.floor_divide(left, cell_size),
+        np.floor_divide(top, cell_size),
+        np.floor_divide(left + width, cell_size),
+        np.floor_divide(top + height, cell_size),
+    ], axis=1)
+
+
+# Função que devolve o menor e o maior tamanho entre os frames de um clipe
+def clip_sizes(clip):
+    sizes = [image_size(name) for name in clip.frames]
+    return (min(w for w, h in sizes), min(h for w, h in sizes)), (max(w for w, h in sizes), max(h for w, h in sizes))
+
+
+# Função que calcula as células ocupadas com o menor e com o maior frame do
+# clipe. O ator só troca de frame quando é testado ou desenhado, então o
+# índice é atualizado quando qualquer uma das duas faixas muda: assim o
+# retângulo guardado nunca fica mais longe do real do que a diferença entre
+# os frames (coberta pela margem das consultas de colisão).
+def clip_cell_ranges(x, y, sizes, cell_size):
+    (min_w, min_h), (max_w, max_h) = sizes
+    return np.hstack([cell_ranges(x, y, min_w, min_h, cell_size),
+                      cell_ranges(x, y, max_w, max_h, cell_size)])
+
+
+# Classe que guarda as plataformas móveis e os inimigos de um Game em arrays
+class EntityBatch:
+    def __init__(self, game):
+        self.game = game
+        self.slots = {} # Objeto -> (tipo, índice nos arrays)
+
+        # Plataformas móveis
+        self.platforms = list(game.moving_platforms)
+        self.platform_x = np.array([p.x for p in self.platforms], dtype=float)
+        self.platform_y = np.array([p.y for p in self.platforms], dtype=float)
+        self.platform_start_x = np.array([p.start_x for p in self.platforms], dtype=float)
+        self.platform_direction = np.array([p.direction for p in self.platforms], dtype=float)
+        self.platform_range = np.array([p.move_range for p in self.platforms], dtype=float)
+        self.platform_width = np.array([p.width for p in self.platforms], dtype=float)
+        self.platform_height = np.array([p.height for p in self.platforms], dtype=float)
+
+        # Inimigos terrestres
+        self.enemies = list(game.enemies)
+        self.enemy_x = np.array([e.actor.x for e in self.enemies], dtype=float)
+        self.enemy_y = np.array([e.actor.y for e in self.enemies], dtype=float)
+        self.enemy_start_x = np.array([e.start_x for e in self.enemies], dtype=float)
+        self.enemy_direction = np.array([e.direction for e in self.enemies], dtype=float)
+        self.enemy_speed = np.array([e.speed for e in self.enemies], dtype=float)
+        self.enemy_range = np.array([e.patrol_range for e in self.enemies], dtype=float)
+        self.enemy_active = np.array([e.active for e in self.enemies], dtype=bool)
+        self.enemy_sizes = clip_sizes(ENEMY_IDLE)
+
+        # Inimigos voadores
+        self.flyers = list(game.flying_enemies)
+        self.flyer_x = np.array([f.actor.x for f in self.flyers], dtype=float)
+        self.flyer_y = np.array([f.actor.y for f in self.flyers], dtype=float)
+        self.flyer_start_x = np.array([f.start_x for f in self.flyers], dtype=float)
+        self.flyer_start_y = np.array([f.start_y for f in self.flyers], dtype=float)
+        self.flyer_time = np.array([f.time for f in self.flyers], dtype=float)
+        self.flyer_amplitude = np.array([f.amplitude for f in self.flyers], dtype=float)
+        self.flyer_direction = np.array([f.direction for f in self.flyers], dtype=float)
+        self.flyer_speed = np.array([f.speed for f in self.flyers], dtype=float)
+        self.flyer_range = np.array([f.patrol_range for f in self.flyers], dtype=float)
+        self.flyer_active = np.array([f.active for f in self.flyers], dtype=bool)
+        self.flyer_sizes = clip_sizes(FLYER_LEFT)
+
+        for i, platform in enumerate(self.platforms):
+            self.slots[platform] = ('platform', i)
+        for i, enemy in enumerate(self.enemies):
+            self.slots[enemy] = ('enemy', i)
+        for i, flyer in enumerate(self.flyers):
+            self.slots[flyer] = ('flyer', i)
+
+        # Células ocupadas no último sincronismo, para saber quem mudou de célula
+        self.platform_cells = self.platform_range_cells()
+        self.enemy_cells = self.enemy_range_cells()
+        self.flyer_cells = self.flyer_range_cells()
+
+    def platform_range_cells(self):
+        return cell_ranges(self.platform_x, self.platform_y, self.platform_width,
+                           self.platform_height, self.game.platform_index.cell_size)
+
+    def enemy_range_cells(self):
+        return clip_cell_ranges(self.enemy_x, self.enemy_y, self.enemy_sizes,
+                                self.game.enemy_index.cell_size)
+
+    def flyer_range_cells(self):
+        return clip_cell_ranges(self.flyer_x, self.flyer_y, self.flyer_sizes,
+                                self.game.enemy_index.cell_size)
+
+    # Atualiza todas as plataformas móveis e inimigos de uma vez
+    def update(self, dt):
+        game = self.game
+
+        # Plataformas móveis (mesma regra de Platform.update). O jogador testa
+        # colisão com elas dentro de Player.update, então a posição X de todas
+        # é copiada de volta para os atores.
+        self.platform_x += self.platform_direction * 100 * dt
+        turn = np.abs(self.platform_x - self.platform_start_x) > self.platform_range
+        self.platform_direction[turn] *= -1
+        for platform, x in zip(self.platforms, self.platform_x.tolist()):
+            platform.x = x
+        for i in np.flatnonzero(turn).tolist():
+            self.platforms[i].direction = int(self.platform_direction[i])
+        cells = self.platform_range_cells()
+        for i in np.flatnonzero((cells != self.platform_cells).any(axis=1)).tolist():
+            game.platform_index.move(self.platforms[i])
+        self.platform_cells = cells
+
+        # Inimigos terrestres
+        patrol(self.enemy_x, self.enemy_start_x, self.enemy_direction, self.enemy_speed,
+               self.enemy_range, self.enemy_active, dt)
+
+        # Inimigos voadores (movimento senoidal calculado para todos juntos)
+        patrol(self.flyer_x, self.flyer_start_x, self.flyer_direction, self.flyer_speed,
+               self.flyer_range, self.flyer_active, dt)
+        np.add(self.flyer_time, dt, out=self.flyer_time, where=self.flyer_active)
+        np.copyto(self.flyer_y, self.flyer_start_y + np.sin(self.flyer_time * 3) * self.flyer_amplitude,
+                  where=self.flyer_active)
+
+        # Só quem mudou de célula é sincronizado e reposicionado no índice
+        cells = self.enemy_range_cells()
+        for i in np.flatnonzero(self.enemy_active & (cells != self.enemy_cells).any(axis=1)).tolist():
+            self.sync_enemy(i)
+            game.enemy_index.move(self.enemies[i])
+        self.enemy_cells = cells
+
+        cells = self.flyer_range_cells()
+        for i in np.flatnonzero(self.flyer_active & (cells != self.flyer_cells).any(axis=1)).tolist():
+            self.sync_flyer(i)
+            game.enemy_index.move(self.flyers[i])
+        self.flyer_cells = cells
+
+    # Copia o estado de um inimigo terrestre dos arrays para o objeto
+    def sync_enemy(self, i):
+        enemy = self.enemies[i]
+        enemy.actor.x = float(self.enemy_x[i])
+        enemy.direction = int(self.enemy_direction[i])
+        enemy.actor.flip_x = (enemy.direction < 0)
+
+    # Copia o estado de um inimigo voador dos arrays para o objeto
+    def sync_flyer(self, i):
+        flyer = self.flyers[i]
+        flyer.actor.x = float(self.flyer_x[i])
+        flyer.actor.y = float(self.flyer_y[i])
+        flyer.time = float(self.flyer_time[i])
+        flyer.direction = int(self.flyer_direction[i])
+        flyer.actor.animation.clip = FLYER_RIGHT if flyer.direction > 0 else FLYER_LEFT
+
+    # Sincroniza uma lista de inimigos (por exemplo, candidatos a colisão)
+    def sync(self, entities):
+        for entity in entities:
+            kind, i = self.slots[entity]
+            if kind == 'enemy':
+                self.sync_enemy(i)
+            elif kind == 'flyer':
+                self.sync_flyer(i)
+
+    # Sincroniza todos os inimigos ativos
+    def sync_all(self):
+        for i in np.flatnonzero(self.enemy_active).tolist():
+            self.sync_enemy(i)
+        for i in np.flatnonzero(self.flyer_active).tolist():
+            self.sync_flyer(i)
+
+    # Copia todo o estado dos arrays de volta para os objetos (antes de
+    # recriar o lote, por exemplo quando pedaços da fase são carregados)
+    def flush(self):
+        self.sync_all()
+        for platform, direction in zip(self.platforms, self.platform_direction.tolist()):
+            platform.direction = int(direction)
+
+    # Tira um inimigo derrotado da atualização em lote
+    def deactivate(self, entity):
+        kind, i = self.slots[entity]
+        if kind == 'enemy':
+            self.sync_enemy(i)
+            self.enemy_active[i] = False
+        elif kind == 'flyer':
+            self.sync_flyer(i)
+            self.flyer_active[i] = False
@@ -0,0 +1,28 @@
+# Classe da câmera que segue o jogador em fases maiores que a janela. O
+# retângulo da câmera (left, top, width, height) é a parte da fase que aparece
+# na tela, e serve também para consultar os índices espaciais na hora de
+# desenhar, para que só o que está visível seja desenhado.
+class Camera:
+    def __init__(self, width, height, level_width, level_height):
+        self.width = width # Tamanho da janela
+        self.height = height
+        self.level_width = level_width # Tamanho da fase (a câmera não sai dela)
+        self.level_height = level_height
+        self.left = 0 # Canto superior esquerdo da câmera na fase
+        self.top = 0
+
+    # Centraliza a câmera na posição, sem mostrar nada fora da fase
+    def follow(self, x, y):
+        self.left = max(0, min(self.level_width - self.width, x - self.width / 2))
+        self.top = max(0, min(self.level_height - self.height, y - self.height / 2))
+
+    # Converte uma posição da fase para a posição na tela
+    def to_screen(self, x, y):
+        return x - self.left, y - self.top
+
+    # Verifica se um retângulo aparece na tela (com uma margem opcional em volta)
+    def is_visible(self, rect, margin=0):
+        return (rect.left < self.left + self.width + margin and
+                rect.left + rect.width > self.left - margin and
+                rect.top < self.top + self.height + margin and
+                rect.top + rect.height > self.top - margin)
@@ -0,0 +1,187 @@
+import json
+import os
+import sys
+
+import atlas
+
+# Colisão por máscara de pixels. O teste pelo retângulo do sprite acerta os
+# cantos transparentes dos frames (a cabeça do herói, as asas do inimigo
+# voador), então depois que os retângulos se encostam os pixels opacos dos
+# dois frames são comparados. Só os pares que já passaram pelo índice
+# espacial e pelo colliderect chegam aqui.
+#
+# As máscaras são geradas junto com o atlas (images/atlas_masks.json, com
+# cada linha do frame guardada como um número em hexadecimal) e lidas sem o
+# pygame, para a simulação continuar rodando sem janela. Cada linha vira um
+# inteiro do Python em que o bit x é a coluna x; a sobreposição de duas
+# linhas é um AND com deslocamento e uma contagem de bits. A máscara de cada
+# frame (inclusive a dos espelhados, com os bits de cada linha invertidos) é
+# montada uma vez, na primeira colisão com aquele frame, e fica em cache.
+#
+# Além de dizer se os pixels se tocam, contact() devolve a normal do contato:
+# o lado por onde o segundo objeto sai da sobreposição andando menos pixels
+# (a menor penetração, medida pelas colunas e linhas sólidas de cada frame).
+# É ela que decide se o jogador caiu em cima do inimigo ou bateu nele de lado.
+#
+# Para gerar as máscaras de novo sem montar o atlas:
+#   python collision.py
+
+MASKS_DATA = os.path.join(atlas.IMAGES_DIR, 'atlas_masks.json')
+ALPHA_THRESHOLD = 127 # Pixels com alfa acima disto contam como sólidos (mesmo padrão do pygame.mask)
+
+_rows = {} # Nome do frame (sem espelhar) -> linhas lidas do arquivo
+_masks = {} # Índice do frame -> máscara pronta
+_solid = {} # (largura, altura) -> máscara cheia (imagens sem máscara)
+
+
+# Classe de uma máscara: largura, altura e as linhas como inteiros
+class Mask:
+    def __init__(self, width, height, rows):
+        self.width = width
+        self.height = height
+        self.rows = rows # Linha -> inteiro com um bit por coluna (bit 0 = coluna da esquerda)
+        self._extents = None
+
+    # Primeira e última coluna sólida de cada linha e primeira e última linha
+    # sólida de cada coluna (None onde não há pixel), calculadas uma vez
+    def extents(self):
+        if self._extents is None:
+            row_spans = [((row & -row).bit_length() - 1, row.bit_length() - 1) if row else None
+                         for row in self.rows]
+            column_spans = [None] * self.width
+            for y, row in enumerate(self.rows):
+                while row:
+                    x = (row & -row).bit_length() - 1
+                    span = column_spans[x]
+                    column_spans[x] = (y, y) if span is None else (span[0], y)
+                    row &= row - 1
+            self._extents = (row_spans, column_spans)
+        return self._extents
+
+    # Devolve a máscara espelhada na horizontal
+    def flipped(self):
+        return Mask(self.width, self.height,
+                    [int(format(row, f'0{self.width}b')[::-1], 2) for row in self.rows])
+
+    # Número de pixels sólidos em comum com outra máscara deslocada de (dx, dy)
+    def overlap_area(self, other, dx, dy):
+        area = 0
+        rows = other.rows
+        for y in range(max(0, dy), min(self.height, dy + other.height)):
+            row = rows[y - dy]
+            area += (self.rows[y] & (row << dx if dx >= 0 else row >> -dx)).bit_count()
+        return area
+
+
+# Função que calcula as linhas da máscara de uma superfície do pygame
+def surface_rows(surface):
+    import pygame
+    mask = pygame.mask.from_surface(surface, ALPHA_THRESHOLD)
+    width, height = mask.get_size()
+    rows = []
+    for y in range(height):
+        row = 0
+        for x in range(width):
+            if mask.get_at((x, y)):
+                row |= 1 << x
+        rows.append(row)
+    return rows
+
+
+# Função que grava as máscaras dos frames do atlas (os espelhados saem destes)
+def save_masks(sheet, path=MASKS_DATA):
+    lines = []
+    for name, rect, flipped in zip(atlas.FRAME_NAMES, atlas.FRAME_RECTS, atlas.FRAME_FLIPPED):
+        if not flipped:
+            rows = [format(row, 'x') for row in surface_rows(sheet.subsurface(rect))]
+            lines.append(f'  {json.dumps(name)}: {json.dumps(rows, separators=(",", ":"))}')
+    # Um frame por linha, como no atlas.json
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n' + ',\n'.join(lines) + '\n}\n')
+    load_rows(path)
+
+
+# Função que lê o arquivo de máscaras (sem ele, todo frame colide pelo retângulo)
+def load_rows(path=MASKS_DATA):
+    _rows.clear()
+    _masks.clear()
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for name, rows in json.load(f).items():
+            _rows[name] = [int(row, 16) for row in rows]
+
+
+# Função que devolve a máscara de um retângulo cheio
+def solid_mask(width, height):
+    mask = _solid.get((width, height))
+    if mask is None:
+        mask = _solid[(width, height)] = Mask(width, height, [(1 << width) - 1] * height)
+    return mask
+
+
+# Função que devolve a máscara do frame atual de um ator (montada na primeira vez)
+def actor_mask(actor):
+    index = actor.frame
+    mask = _masks.get(index)
+    if mask is None:
+        if index is None:
+            return solid_mask(int(actor.width), int(actor.height))
+        name = atlas.FRAME_NAMES[index]
+        flipped = atlas.FRAME_FLIPPED[index]
+        rows = _rows.get(name[:-len('_flip')] if flipped else name)
+        width, height = atlas.FRAME_RECTS[index][2:]
+        if rows is None:
+            mask = solid_mask(width, height)
+        else:
+            mask = Mask(width, height, rows)
+            if flipped:
+                mask = mask.flipped()
+        _masks[index] = mask
+    return mask
+
+
+# Função que calcula quantos pixels o segundo intervalo tem que andar para
+# trás e para a frente para sair do primeiro (0, 0 se eles não se cruzam)
+def span_depths(span_a, span_b, offset):
+    if span_a is None or span_b is None:
+        return 0, 0
+    start, end = span_b[0] + offset, span_b[1] + offset
+    if start > span_a[1] or end < span_a[0]:
+        return 0, 0
+    return end - span_a[0] + 1, span_a[1] - start + 1
+
+
+# Função que testa os pixels de dois atores cujos retângulos já se encostam.
+# Devolve None se só as partes transparentes se tocam; senão, a normal do
+# contato (dx, dy), apontando do primeiro ator para o segundo: o lado para o
+# qual o segundo ator sai da sobreposição com o menor deslocamento.
+def contact(a, b):
+    mask_a = actor_mask(a)
+    mask_b = actor_mask(b)
+    dx = int(round(b.left - a.left))
+    dy = int(round(b.top - a.top))
+    if not mask_a.overlap_area(mask_b, dx, dy):
+        return None
+
+    # Penetração para cada lado, coluna por coluna e linha por linha
+    rows_a, columns_a = mask_a.extents()
+    rows_b, columns_b = mask_b.extents()
+    up = down = left = right = 0
+    for x in range(max(0, dx), min(mask_a.width, dx + mask_b.width)):
+        to_up, to_down = span_depths(columns_a[x], columns_b[x - dx], dy)
+        up, down = max(up, to_up), max(down, to_down)
+    for y in range(max(0, dy), min(mask_a.height, dy + mask_b.height)):
+        to_left, to_right = span_depths(rows_a[y], rows_b[y - dy], dx)
+        left, right = max(left, to_left), max(right, to_right)
+    # No empate vale a primeira da lista (por cima ganha de pelo lado)
+    sides = ((down, (0, 1)), (up, (0, -1)), (right, (1, 0)), (left, (-1, 0)))
+    return min(sides, key=lambda side: side[0])[1]
+
+
+load_rows()
+
+
+if __name__ == '__main__':
+    import pygame
+    save_masks(pygame.image.load(sys.argv[1] if len(sys.argv) > 1 else atlas.ATLAS_IMAGE))
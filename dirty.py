@@ -0,0 +1,154 @@
+from collections import Counter
+
+# Desenho por retângulos sujos (dirty rects). Em vez de limpar e redesenhar a
+# tela inteira a cada quadro, o draw() só anota o que seria desenhado
+# (superfície e posição) sobre o cenário em cache. No fim do quadro a lista é
+# comparada com a do quadro anterior: só as áreas onde algo apareceu, sumiu,
+# mudou de imagem ou de lugar são refeitas (o cenário é copiado de volta
+# nessas áreas e os desenhos que passam por elas são desenhados de novo,
+# recortados na área), e só essas áreas são enviadas para a janela.
+#
+# O resultado na tela é o mesmo do desenho completo. Quando a área suja
+# passa de FULL_REDRAW_RATIO da tela (por exemplo, com a câmera andando), o
+# quadro é desenhado inteiro, que nesse caso sai mais barato.
+
+FULL_REDRAW_RATIO = 0.5 # Fração da tela a partir da qual o quadro é redesenhado inteiro
+
+_original_flip = None # pygame.display.flip antes de install()
+
+
+# Classe que acumula os desenhos do quadro e refaz só o que mudou
+class DirtyRenderer:
+    def __init__(self, size):
+        import pygame
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self.backdrop = None # Cenário do quadro atual
+        self.items = [] # Desenhos do quadro: (superfície, x, y)
+        self.previous = [] # Desenhos do quadro anterior (guardam as superfícies vivas)
+        self.previous_backdrop = None
+        self.valid = False # False = a tela não tem o último quadro deste renderizador
+        self.updates = None # Áreas a enviar para a janela (None = a tela inteira)
+        self.dirty_area = 0 # Área refeita no último quadro, em pixels (para medir)
+
+    # Começa um quadro sobre o cenário dado
+    def begin(self, backdrop):
+        self.backdrop = backdrop
+        self.items = []
+
+    # Anota um desenho (mesma interface do screen.blit, com a posição truncada como no pygame)
+    def blit(self, surface, pos):
+        self.items.append((surface, int(pos[0]), int(pos[1])))
+
+    # A tela foi desenhada por fora (tela de carregamento, medidor de
+    # desempenho): o próximo quadro é desenhado inteiro
+    def invalidate(self):
+        self.valid = False
+        self.updates = None
+
+    # Calcula as áreas que mudaram desde o quadro anterior
+    def dirty_rects(self):
+        import pygame
+        current_keys = [(id(surface), x, y) for surface, x, y in self.items]
+        before_keys = [(id(surface), x, y) for surface, x, y in self.previous]
+        current = Counter(current_keys)
+        before = Counter(before_keys)
+        sizes = {id(surface): surface.get_size() for surface, x, y in self.previous + self.items}
+        changed = list((current - before) + (before - current))
+
+        # Desenhos que continuam iguais mas trocaram de ordem (um inimigo que
+        # passou para a frente de outro) também sujam a área
+        kept_now = [key for key in current_keys if key in before]
+        kept_before = [key for key in before_keys if key in current]
+        for now, then in zip(kept_now, kept_before):
+            if now != then:
+                changed += [now, then]
+
+        rects = []
+        for surface_id, x, y in changed:
+            rect = pygame.Rect((x, y), sizes[surface_id]).clip(self.screen_rect)
+            if rect.width and rect.height:
+                rects.append(rect)
+        return merge_rects(rects)
+
+    # Desenha o quadro na superfície da tela
+    def end(self, target):
+        rects = None
+        if self.valid and self.backdrop is self.previous_backdrop:
+            rects = self.dirty_rects()
+            area = sum(rect.width * rect.height for rect in rects)
+            if area > FULL_REDRAW_RATIO * self.screen_rect.width * self.screen_rect.height:
+                rects = None
+
+        if rects is None:
+            # Quadro inteiro
+            target.blit(self.backdrop, (0, 0))
+            for surface, x, y in self.items:
+                target.blit(surface, (x, y))
+            self.dirty_area = self.screen_rect.width * self.screen_rect.height
+        else:
+            # Só as áreas sujas, cada uma recortada para não desenhar nada duas vezes
+            for rect in rects:
+                target.set_clip(rect)
+                target.blit(self.backdrop, rect.topleft, rect)
+                for surface, x, y in self.items:
+                    width, height = surface.get_size()
+                    if x < rect.right and x + width > rect.left and y < rect.bottom and y + height > rect.top:
+                        target.blit(surface, (x, y))
+            target.set_clip(None)
+            self.dirty_area = sum(rect.width * rect.height for rect in rects)
+
+        self.updates = rects
+        self.previous = self.items
+        self.previous_backdrop = self.backdrop
+        self.valid = True
+
+    # Devolve (e esquece) as áreas a enviar para a janela
+    def take_updates(self):
+        updates, self.updates = self.updates, None
+        return updates
+
+
+# Função que junta os retângulos que se sobrepõem (até não sobrar nenhum par sobreposto)
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        while True:
+            hit = rect.collidelist(merged)
+            if hit < 0:
+                break
+            rect = rect.union(merged.pop(hit))
+        merged.append(rect)
+    return merged
+
+
+# O laço principal do pgzero sempre chama pygame.display.flip() depois do
+# draw(), sem outro jeito de escolher as áreas enviadas para a janela; por
+# isso esta função troca o pygame.display.flip do processo por uma que envia
+# só as áreas refeitas pelo renderizador (e continua enviando a tela inteira
+# nos quadros desenhados por fora dele). Devolve o flip original, que
+# uninstall() coloca de volta.
+def install(renderer):
+    global _original_flip
+    import pygame
+    if _original_flip is None:
+        _original_flip = pygame.display.flip
+    flip = _original_flip
+
+    def present():
+        rects = renderer.take_updates()
+        if rects is None:
+            flip()
+        elif rects:
+            pygame.display.update(rects)
+
+    pygame.display.flip = present
+    return flip
+
+
+# Função que devolve o pygame.display.flip original (desfaz install())
+def uninstall():
+    global _original_flip
+    import pygame
+    if _original_flip is not None:
+        pygame.display.flip = _original_flip
+        _original_flip = None
@@ -0,0 +1,263 @@
+import bisect
+import json
+import math
+import random
+import sys
+import time
+from collections import namedtuple
+
+from levels import JsonLevel, save_binary
+from simulation import Player, PHYSICS_HZ, HEIGHT, image_size
+from spatial import SpatialHash
+
+# Gerador de fases. Monta fases do tamanho que for (no formato JSON de
+# levels.py) com a garantia de que a plataforma final pode ser alcançada.
+#
+# O alcance do pulo vem das constantes do próprio Player (força do pulo,
+# gravidade e velocidade horizontal) e do mesmo passo fixo da física: a
+# trajetória do pulo é simulada uma vez e vira uma tabela (o envelope do
+# pulo) que diz, para cada diferença de altura entre duas plataformas, a
+# maior distância horizontal que dá para vencer caindo em cima da outra (a
+# mesma regra de pouso de Player.update).
+#
+# A fase é montada como um caminho de plataformas até a final, cada uma
+# dentro do envelope da anterior, mais plataformas soltas fora do caminho.
+# Depois o grafo de alcance é calculado entre todas as plataformas (com o
+# índice espacial, cada plataforma só é comparada com as que estão dentro do
+# alcance máximo do pulo) e percorrido a partir do chão. Plataformas móveis
+# contam pela faixa inteira que percorrem (o jogador pode esperar por elas).
+# Uma fase em que a final não pode ser alcançada é descartada e sorteada de
+# novo. As moedas só vão para plataformas alcançáveis.
+#
+# Uso:
+#   python generator.py                                  gera 10000 plataformas e mostra os tempos
+#   python generator.py 5000 levels/gerada.bin [semente] grava a fase (.json ou .bin)
+
+FLOOR_Y = HEIGHT - 100 # Altura do chão (onde ficam os pés do jogador)
+START_X = 100 # Posição inicial do jogador
+MIN_Y = 100 # Faixa do centro das plataformas
+MAX_Y = 440
+CHUNK_SIZE = 800
+CELL_SIZE = 256 # Célula do índice espacial do grafo
+PLATFORM_IMAGE = 'platform'
+MOVING_IMAGE = 'platform_moving'
+FINAL_IMAGE = 'platform_win'
+
+REACH_SAFETY = 0.85 # Fração do alcance do pulo usada (sobra para o jogador errar um pouco)
+STEP_GAP = (0.2, 0.9) # Distância entre plataformas do caminho, em fração do alcance
+STEP_DROP = 150 # Maior descida entre duas plataformas do caminho
+FINAL_CLIMB = 4 # Últimas plataformas do caminho sempre sobem (a final fica no alto)
+MOVING_CHANCE = 0.2 # Chance de uma plataforma ser móvel
+MOVE_RANGE = (50, 150) # Alcance das plataformas móveis
+EXTRA_RATIO = 0.25 # Plataformas soltas, em fração do total
+COIN_CHANCE = 0.5 # Chance de uma plataforma alcançável ter moeda
+COIN_HEIGHT = 40 # Altura da moeda acima da plataforma
+ENEMY_SPACING = (400, 1200) # Distância entre inimigos no chão
+FLYER_CHANCE = 0.15 # Chance de um inimigo voador depois de uma plataforma do caminho
+FLYER_Y = (150, 300)
+SAFE_START = 500 # Sem inimigos perto do início
+MAX_ATTEMPTS = 20 # Sorteios antes de desistir
+DEFAULT_PLATFORMS = 10000
+
+# Retângulo usado nas consultas ao índice espacial
+Box = namedtuple('Box', ['left', 'top', 'width', 'height'])
+
+
+# Classe com o envelope do pulo: alcance horizontal para cada diferença de altura
+class JumpArc:
+    def __init__(self, player=None, physics_hz=PHYSICS_HZ, hero_image='hero_jump'):
+        player = player or Player()
+        dt = 1 / physics_hz
+        half_height = image_size(hero_image)[1] / 2
+
+        # Subida do centro do jogador a cada passo, como em Player.update
+        # (gravidade primeiro, depois a posição)
+        rise = [0.0]
+        velocity = player.jump_strength
+        falling = [] # Passos já descendo: (passo, subida no passo anterior, subida no passo)
+        while rise[-1] > -2 * HEIGHT:
+            velocity += player.gravity * dt
+            rise.append(rise[-1] - velocity * dt)
+            if velocity > 0:
+                falling.append((len(rise) - 1, rise[-2], rise[-1]))
+
+        # O pouso num passo descendo precisa do centro acima do topo no passo
+        # anterior e dos pés abaixo do topo no passo atual. Para uma altura h
+        # (topo da outra plataforma acima dos pés na saída), o último passo
+        # que ainda serve dá o tempo no ar e, com a velocidade, o alcance.
+        center_limits = [-(before + half_height) for step, before, after in falling] # Crescente
+        feet = [-after for step, before, after in falling] # Crescente
+        self.min_height = -2 * HEIGHT
+        self.reach_table = [] # Altura (a partir de min_height) -> alcance horizontal
+        for height in range(self.min_height, HEIGHT):
+            last = bisect.bisect_right(center_limits, -height) - 1
+            first = bisect.bisect_right(feet, -height)
+            if last < 0 or first > last:
+                break
+            self.reach_table.append(player.speed * falling[last][0] * dt * REACH_SAFETY)
+        self.max_height = self.min_height + len(self.reach_table) - 1 # Maior subida possível
+
+    # Alcance horizontal para subir height pixels (negativo = descer), ou None
+    def reach(self, height):
+        index = math.ceil(height) - self.min_height
+        if index >= len(self.reach_table):
+            return None
+        return self.reach_table[max(0, index)]
+
+
+# Classe de uma plataforma no grafo: a faixa que ela ocupa (com o movimento)
+class Ledge:
+    def __init__(self, index, x, y, width, height, move_range=0):
+        self.index = index
+        self.left = x - width / 2 - move_range
+        self.right = x + width / 2 + move_range
+        self.top = y - height / 2
+        self.width = self.right - self.left
+        self.height = height
+
+
+# Função que transforma as plataformas da fase (formato JSON) em faixas
+def level_ledges(platforms):
+    ledges = []
+    for i, platform in enumerate(platforms):
+        width, height = image_size(platform['image'])
+        x, y = platform['pos']
+        ledges.append(Ledge(i, x, y, width, height, platform.get('move_range', 0) if platform.get('moving') else 0))
+    return ledges
+
+
+# Função que calcula o grafo de alcance: para cada plataforma, as plataformas
+# em que dá para cair pulando dela. Devolve também as que dá para alcançar
+# direto do chão (do chão o jogador anda para qualquer lado e de qualquer
+# plataforma ele pode voltar para o chão).
+def reachability_graph(ledges, arc):
+    index = SpatialHash(CELL_SIZE)
+    for ledge in ledges:
+        index.insert(ledge)
+    graph = []
+    for ledge in ledges:
+        edges = []
+        # Só as plataformas entre a maior subida e o chão, até onde o pulo vai
+        top = ledge.top - arc.max_height
+        reach = arc.reach(ledge.top - FLOOR_Y)
+        box = Box(ledge.left - reach, top, ledge.width + 2 * reach, FLOOR_Y - top)
+        for other in index.query(box):
+            if other is ledge:
+                continue
+            reach = arc.reach(ledge.top - other.top)
+            if reach is not None and max(other.left - ledge.right, ledge.left - other.right) <= reach:
+                edges.append(other.index)
+        graph.append(edges)
+    from_floor = [ledge.index for ledge in ledges if arc.reach(FLOOR_Y - ledge.top) is not None]
+    return graph, from_floor
+
+
+# Função que devolve o conjunto de plataformas alcançáveis a partir do chão
+def reachable(graph, from_floor):
+    seen = set(from_floor)
+    pending = list(from_floor)
+    while pending:
+        for other in graph[pending.pop()]:
+            if other not in seen:
+                seen.add(other)
+                pending.append(other)
+    return seen
+
+
+# Função que sorteia uma plataforma, móvel ou não
+def random_platform(rng, x, y):
+    if rng.random() < MOVING_CHANCE:
+        return {'image': MOVING_IMAGE, 'pos': [x, y], 'moving': True,
+                'move_range': round(rng.uniform(*MOVE_RANGE))}
+    return {'image': PLATFORM_IMAGE, 'pos': [x, y]}
+
+
+# Função que sorteia o caminho até a plataforma final e as plataformas soltas
+def layout(platform_count, arc, rng):
+    width, height = image_size(PLATFORM_IMAGE)
+    path_count = platform_count - int(platform_count * EXTRA_RATIO)
+    platforms = []
+    flyers = []
+    previous = Ledge(None, START_X, FLOOR_Y + height / 2, 0, height) # O chão no início
+    for i in range(path_count):
+        # Altura da próxima plataforma dentro do que o pulo alcança (e da faixa da fase)
+        if i >= path_count - FINAL_CLIMB:
+            climb = rng.uniform(arc.max_height / 2, arc.max_height)
+        else:
+            climb = rng.uniform(-STEP_DROP, arc.max_height)
+        y = round(min(MAX_Y, max(MIN_Y, previous.top - climb + height / 2)))
+        reach = arc.reach(previous.top - (y - height / 2))
+        if i == path_count - 1:
+            platform = {'image': FINAL_IMAGE, 'pos': [0, y], 'is_final': True}
+        else:
+            platform = random_platform(rng, 0, y)
+        move_range = platform.get('move_range', 0)
+        # A borda da faixa nova fica a uma fração do alcance depois da anterior
+        left = previous.right + rng.uniform(*STEP_GAP) * reach
+        platform['pos'][0] = round(left + move_range + width / 2)
+        platforms.append(platform)
+        previous = Ledge(None, platform['pos'][0], y, width, height, move_range)
+        if rng.random() < FLYER_CHANCE and previous.left > SAFE_START:
+            flyers.append([round(previous.left - reach / 2), round(rng.uniform(*FLYER_Y))])
+
+    # Plataformas soltas em qualquer lugar da fase (podem ficar fora de alcance)
+    end = previous.right
+    for _ in range(platform_count - path_count):
+        platforms.append(random_platform(rng, round(rng.uniform(START_X, end)), round(rng.uniform(MIN_Y, MAX_Y))))
+    return platforms, flyers, end
+
+
+# Função que gera uma fase com platform_count plataformas em que a final
+# pode ser alcançada. Devolve os dados da fase (formato JSON de levels.py) e
+# um resumo (tentativas, plataformas alcançáveis, ligações do grafo, tempo).
+def generate(platform_count=DEFAULT_PLATFORMS, seed=None, arc=None):
+    start_time = time.perf_counter()
+    rng = random.Random(seed)
+    arc = arc or JumpArc()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        platforms, flyers, end = layout(platform_count, arc, rng)
+        graph, from_floor = reachability_graph(level_ledges(platforms), arc)
+        seen = reachable(graph, from_floor)
+        if any(platforms[i].get('is_final') for i in seen):
+            break
+    else:
+        raise ValueError(f"could not generate a solvable level in {MAX_ATTEMPTS} attempts")
+
+    # Moedas só em plataformas alcançáveis; inimigos no chão, longe do início
+    width, height = image_size(PLATFORM_IMAGE)
+    coins = []
+    for i in sorted(seen):
+        if rng.random() < COIN_CHANCE:
+            x, y = platforms[i]['pos']
+            coins.append([x, y - height / 2 - COIN_HEIGHT])
+    enemies = []
+    x = SAFE_START + rng.uniform(*ENEMY_SPACING)
+    while x < end:
+        enemies.append([round(x), FLOOR_Y])
+        x += rng.uniform(*ENEMY_SPACING)
+
+    data = {'chunk_size': CHUNK_SIZE, 'platforms': platforms, 'coins': coins,
+            'enemies': enemies, 'flying_enemies': flyers}
+    stats = {'attempts': attempt, 'platforms': len(platforms), 'reachable': len(seen),
+             'edges': sum(len(edges) for edges in graph), 'width': end,
+             'elapsed': time.perf_counter() - start_time}
+    return data, stats
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PLATFORMS
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    arc = JumpArc()
+    print(f"jump: up to {arc.max_height} px high, {arc.reach(0):.0f} px across at the same height")
+    data, stats = generate(count, seed, arc)
+    print(f"{stats['platforms']} platforms ({stats['reachable']} reachable, {stats['edges']} jumps), "
+          f"{stats['width'] / 1000:.0f}k px wide, {stats['attempts']} attempt(s), "
+          f"generated in {stats['elapsed'] * 1000:.0f} ms")
+    if len(sys.argv) > 2:
+        path = sys.argv[2]
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        else:
+            save_binary(JsonLevel(data), path)
+        print(f"Level saved to {path}")
@@ -0,0 +1,186 @@
+import json
+import os
+import struct
+import sys
+
+# Formato das fases. As fases são escritas em JSON (fácil de editar) e
+# compiladas para um formato binário compacto que é o que o jogo carrega.
+# Nos dois casos a fase é dividida em pedaços (chunks) de largura fixa pelo
+# eixo X, e o jogo só instancia os pedaços perto do jogador.
+#
+# Formato JSON:
+#   {
+#     "chunk_size": 800,
+#     "platforms": [{"image": "platform", "pos": [400, 400],
+#                    "moving": false, "move_range": 0, "is_final": false}],
+#     "coins": [[300, 350]],
+#     "enemies": [[300, 500]],
+#     "flying_enemies": [[300, 200]]
+#   }
+#
+# Formato binário (little-endian):
+#   cabeçalho    'KLVL', versão (H), chunk_size (f), nº de imagens (H), nº de pedaços (I)
+#   imagens      para cada uma: tamanho (B) + nome em UTF-8
+#   tabela       para cada pedaço: índice (i), posição no arquivo (I), tamanho (I)
+#   pedaços      contagens (IIII) + plataformas + moedas + inimigos + voadores
+
+LEVELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels')
+DEFAULT_LEVEL = os.path.join(LEVELS_DIR, 'level_1.bin')
+
+MAGIC = b'KLVL'
+VERSION = 1
+HEADER = struct.Struct('<4sHfHI')
+CHUNK_ENTRY = struct.Struct('<iII')
+CHUNK_COUNTS = struct.Struct('<IIII')
+PLATFORM_RECORD = struct.Struct('<HffBf') # imagem, x, y, flags, alcance
+POINT_RECORD = struct.Struct('<ff') # x, y (moedas e inimigos)
+
+MOVING = 1 # Flag de plataforma móvel
+FINAL = 2 # Flag de plataforma final
+
+
+# Classe com o conteúdo de um pedaço da fase (só dados, sem atores)
+class Chunk:
+    def __init__(self):
+        self.platforms = [] # (imagem, x, y, móvel, alcance, final)
+        self.coins = [] # (x, y)
+        self.enemies = [] # (x, y)
+        self.flying_enemies = [] # (x, y)
+
+
+# Função que calcula a largura da fase: vai do X zero até o fim do último pedaço
+def level_width(chunk_ids, chunk_size):
+    return (max(chunk_ids) + 1) * chunk_size if chunk_ids else chunk_size
+
+
+# Classe de uma fase lida do JSON: o arquivo inteiro é lido e separado em pedaços
+class JsonLevel:
+    def __init__(self, data):
+        self.chunk_size = data.get('chunk_size', 800)
+        self.chunks = {}
+        for p in data.get('platforms', []):
+            x, y = p['pos']
+            self.chunk_at(x).platforms.append((p['image'], x, y, p.get('moving', False),
+                                               p.get('move_range', 0), p.get('is_final', False)))
+        for x, y in data.get('coins', []):
+            self.chunk_at(x).coins.append((x, y))
+        for x, y in data.get('enemies', []):
+            self.chunk_at(x).enemies.append((x, y))
+        for x, y in data.get('flying_enemies', []):
+            self.chunk_at(x).flying_enemies.append((x, y))
+        self.chunk_ids = frozenset(self.chunks)
+        self.width = level_width(self.chunk_ids, self.chunk_size)
+
+    # Devolve o pedaço que contém a posição X, criando se ainda não existir
+    def chunk_at(self, x):
+        index = int(x // self.chunk_size)
+        chunk = self.chunks.get(index)
+        if chunk is None:
+            chunk = self.chunks[index] = Chunk()
+        return chunk
+
+    def load_chunk(self, index):
+        return self.chunks[index]
+
+
+# Classe de uma fase binária: só o cabeçalho e a tabela são lidos ao abrir,
+# cada pedaço é lido do arquivo quando o jogo pede
+class BinaryLevel:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, self.chunk_size, image_count, chunk_count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a level file (version {VERSION})")
+            self.images = []
+            for _ in range(image_count):
+                size = f.read(1)[0]
+                self.images.append(f.read(size).decode('utf-8'))
+            self.table = {}
+            for _ in range(chunk_count):
+                index, offset, length = CHUNK_ENTRY.unpack(f.read(CHUNK_ENTRY.size))
+                self.table[index] = (offset, length)
+        self.chunk_ids = frozenset(self.table)
+        self.width = level_width(self.chunk_ids, self.chunk_size)
+
+    def load_chunk(self, index):
+        offset, length = self.table[index]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        return decode_chunk(data, self.images)
+
+
+# Função que transforma um pedaço em bytes
+def encode_chunk(chunk, image_ids):
+    parts = [CHUNK_COUNTS.pack(len(chunk.platforms), len(chunk.coins),
+                               len(chunk.enemies), len(chunk.flying_enemies))]
+    for image, x, y, moving, move_range, is_final in chunk.platforms:
+        flags = (MOVING if moving else 0) | (FINAL if is_final else 0)
+        parts.append(PLATFORM_RECORD.pack(image_ids[image], x, y, flags, move_range))
+    for points in (chunk.coins, chunk.enemies, chunk.flying_enemies):
+        for x, y in points:
+            parts.append(POINT_RECORD.pack(x, y))
+    return b''.join(parts)
+
+
+# Função que lê um pedaço a partir dos bytes
+def decode_chunk(data, images):
+    chunk = Chunk()
+    platform_count, coin_count, enemy_count, flyer_count = CHUNK_COUNTS.unpack_from(data, 0)
+    offset = CHUNK_COUNTS.size
+    for image, x, y, flags, move_range in PLATFORM_RECORD.iter_unpack(
+            data[offset:offset + platform_count * PLATFORM_RECORD.size]):
+        chunk.platforms.append((images[image], x, y, bool(flags & MOVING), move_range, bool(flags & FINAL)))
+    offset += platform_count * PLATFORM_RECORD.size
+    for points, count in ((chunk.coins, coin_count), (chunk.enemies, enemy_count),
+                          (chunk.flying_enemies, flyer_count)):
+        points.extend(POINT_RECORD.iter_unpack(data[offset:offset + count * POINT_RECORD.size]))
+        offset += count * POINT_RECORD.size
+    return chunk
+
+
+# Função que grava uma fase (JsonLevel ou BinaryLevel) no formato binário
+def save_binary(level, path):
+    chunks = {index: level.load_chunk(index) for index in sorted(level.chunk_ids)}
+    images = sorted({p[0] for chunk in chunks.values() for p in chunk.platforms})
+    image_ids = {name: i for i, name in enumerate(images)}
+    blobs = {index: encode_chunk(chunk, image_ids) for index, chunk in chunks.items()}
+
+    image_table = b''.join(bytes([len(name.encode('utf-8'))]) + name.encode('utf-8') for name in images)
+    offset = HEADER.size + len(image_table) + CHUNK_ENTRY.size * len(blobs)
+    table = []
+    for index, blob in blobs.items():
+        table.append(CHUNK_ENTRY.pack(index, offset, len(blob)))
+        offset += len(blob)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, level.chunk_size, len(images), len(blobs)))
+        f.write(image_table)
+        f.write(b''.join(table))
+        for blob in blobs.values():
+            f.write(blob)
+
+
+_loaded_levels = {} # Cache das fases já abertas (reiniciar não lê o arquivo de novo)
+
+
+# Função que abre uma fase pelo caminho (.json ou .bin)
+def load_level(path=DEFAULT_LEVEL):
+    level = _loaded_levels.get(path)
+    if level is None:
+        if path.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                level = JsonLevel(json.load(f))
+        else:
+            level = BinaryLevel(path)
+        _loaded_levels[path] = level
+    return level
+
+
+# Uso: python levels.py fase.json fase.bin (compila a fase para o formato binário)
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python levels.py <level.json> <level.bin>")
+        sys.exit(1)
+    save_binary(load_level(sys.argv[1]), sys.argv[2])
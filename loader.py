@@ -0,0 +1,187 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from atlas import IMAGES_DIR, EXCLUDED_PREFIXES
+from audio import sound_files
+
+# Carregamento dos arquivos do jogo em segundo plano. Uma thread decodifica as
+# imagens que a janela usa (o atlas e as do cenário), os efeitos sonoros e lê
+# a música enquanto a janela já mostra a tela de carregamento com o
+# progresso. Quando termina, a thread principal pega tudo pronto (a conversão
+# das imagens para o formato da tela tem que ser feita nela).
+#
+# A música não é decodificada: o pygame a toca aos poucos direto do arquivo.
+# A thread só lê o arquivo inteiro, para ele já estar no cache do sistema
+# quando a música começar.
+#
+# Para medir o tempo até o primeiro quadro (frio e com cache):
+#   python loader.py [repetições] [startup.json] [--drop-caches]
+
+MUSIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'music')
+GAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game.py')
+BENCHMARK_RUNS = 10 # Repetições com cache na medição de inicialização
+
+
+# Função que lista o que precisa ser carregado: (tipo, nome, caminho)
+def asset_jobs():
+    jobs = []
+    for filename in sorted(os.listdir(IMAGES_DIR)):
+        # Os frames dos sprites já estão dentro do atlas
+        if filename.endswith('.png') and filename.startswith(EXCLUDED_PREFIXES):
+            jobs.append(('image', filename[:-4], os.path.join(IMAGES_DIR, filename)))
+    for name, path in sound_files().items():
+        jobs.append(('sound', name, path))
+    for filename in sorted(os.listdir(MUSIC_DIR)):
+        jobs.append(('music', os.path.splitext(filename)[0], os.path.join(MUSIC_DIR, filename)))
+    return jobs
+
+
+# Classe que carrega os arquivos em uma thread
+class AssetLoader:
+    def __init__(self, jobs=None):
+        self.jobs = jobs if jobs is not None else asset_jobs()
+        self.sizes = [os.path.getsize(path) for kind, name, path in self.jobs]
+        self.total = sum(self.sizes) or 1 # O progresso é medido em bytes
+        self.loaded = 0 # Bytes já carregados (só a thread escreve)
+        self.images = {} # Nome -> superfície decodificada (ainda sem converter)
+        self.sounds = {} # Nome -> som decodificado
+        self.music = [] # Músicas já lidas
+        self.error = None # Exceção da thread, repassada em wait()
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='asset-loader', daemon=True)
+        self.start_time = None
+        self.elapsed = None # Tempo que a thread levou
+
+    def start(self):
+        import pygame
+        # O mixer tem que ser aberto na thread principal antes de decodificar os sons
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+        except pygame.error as e:
+            print(f"Could not open audio device: {e}")
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+    # Método executado na thread
+    def run(self):
+        import pygame
+        try:
+            for (kind, name, path), size in zip(self.jobs, self.sizes):
+                if kind == 'image':
+                    self.images[name] = pygame.image.load(path)
+                elif kind == 'sound':
+                    try:
+                        self.sounds[name] = pygame.mixer.Sound(path)
+                    except pygame.error:
+                        pass # Sem dispositivo de áudio os efeitos ficam mudos
+                else:
+                    with open(path, 'rb') as f:
+                        f.read()
+                    self.music.append(name)
+                self.loaded += size
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed = time.perf_counter() - self.start_time
+            self.finished.set()
+
+    # Fração já carregada, de 0 a 1
+    @property
+    def progress(self):
+        return self.loaded / self.total
+
+    def done(self):
+        return self.finished.is_set()
+
+    # Espera a thread terminar (a exceção dela, se houver, aparece aqui)
+    def wait(self):
+        self.finished.wait()
+        if self.error is not None:
+            raise self.error
+
+
+# Código do processo medido: roda o game.py como o pgzrun faria e anota o
+# horário do primeiro quadro e do primeiro quadro com o jogo pronto
+BENCHMARK_CHILD = '''
+import json, sys, time
+from types import ModuleType
+sys._pgzrun = True
+import pgzero.runner, pgzero.game
+path = sys.argv[1]
+mod = ModuleType('game')
+mod.__file__ = path
+sys.modules['game'] = mod
+pgzero.runner.prepare_mod(mod)
+with open(path, encoding='utf-8') as f:
+    exec(compile(f.read(), path, 'exec', dont_inherit=True), mod.__dict__)
+frames = []
+draw = mod.draw
+def timed_draw():
+    draw()
+    frames.append(time.time())
+    if mod.game is not None:
+        print(json.dumps({'first_frame': frames[0], 'ready': frames[-1], 'frames': len(frames)}))
+        sys.exit(0)
+mod.draw = timed_draw
+pgzero.game.PGZeroGame(mod).run()
+'''
+
+
+# Função que abre o jogo em um processo novo (sem janela e sem som) e mede,
+# desde o início do processo, o tempo até o primeiro quadro e até o jogo ficar pronto
+def measure_startup(env):
+    with tempfile.TemporaryDirectory() as workdir: # O que o processo medido gravar fica fora do projeto
+        start = time.time()
+        result = subprocess.run([sys.executable, '-c', BENCHMARK_CHILD, GAME_SCRIPT], env=env, cwd=workdir,
+                                capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data['first_frame'] - start, data['ready'] - start
+
+
+# Função que mede a inicialização fria e com cache. A medição fria usa uma
+# pasta de bytecode vazia (todos os módulos, inclusive os do pygame, são
+# compilados de novo). O cache de arquivos do sistema só é esvaziado com
+# drop_caches (--drop-caches, precisa de root), porque isso vale para a
+# máquina inteira; sem ele os arquivos da medição fria já estão no cache.
+def benchmark(runs=BENCHMARK_RUNS, drop_caches=False):
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    dropped = False
+    if drop_caches:
+        try:
+            os.sync()
+            with open('/proc/sys/vm/drop_caches', 'w') as f:
+                f.write('3')
+            dropped = True
+        except OSError as e:
+            print(f"Could not drop the page cache: {e}")
+    with tempfile.TemporaryDirectory() as pycache:
+        cold = measure_startup(dict(env, PYTHONPYCACHEPREFIX=pycache))
+    measure_startup(env) # Aquece os caches
+    warm = [measure_startup(env) for _ in range(runs)]
+    return {
+        'cold': {'first_frame': cold[0], 'ready': cold[1], 'page_cache_dropped': dropped},
+        'warm': {'first_frame': statistics.median(t[0] for t in warm),
+                 'ready': statistics.median(t[1] for t in warm),
+                 'runs': runs},
+    }
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--drop-caches']
+    runs = int(args[0]) if args else BENCHMARK_RUNS
+    results = benchmark(runs, drop_caches='--drop-caches' in sys.argv)
+    cold, warm = results['cold'], results['warm']
+    print(f"cold: first frame {cold['first_frame'] * 1000:7.1f} ms, ready {cold['ready'] * 1000:7.1f} ms"
+          + ("" if cold['page_cache_dropped'] else " (bytecode only, page cache warm; --drop-caches as root)"))
+    print(f"warm: first frame {warm['first_frame'] * 1000:7.1f} ms, ready {warm['ready'] * 1000:7.1f} ms"
+          f" (median of {runs})")
+    if len(args) > 1:
+        with open(args[1], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
@@ -0,0 +1,126 @@
+# Codificação das fotografias de rede do multijogador (network.py). A cada
+# tick o servidor monta, para cada cliente, o estado do que está perto do
+# jogador dele: um dicionário id -> tupla de inteiros (tipo, x, y, frame,
+# vida, pontos), com as posições quantizadas em 1/QUANT de pixel. Esse
+# estado é enviado como diferença em relação ao último estado que o cliente
+# confirmou ter recebido (a base): só vão os objetos que apareceram, sumiram
+# ou mudaram, e de cada objeto que mudou só os campos que mudaram, como
+# diferença. Os números são gravados como varints (7 bits por byte), então
+# uma diferença pequena, como um inimigo andando alguns pixels, ocupa um byte.
+#
+# Formato de uma diferença: número de registros (varint) e, para cada
+# objeto em ordem crescente de id:
+#   id          diferença para o id do registro anterior (varint)
+#   flags       byte: SPAWN (todos os campos, valores absolutos), REMOVE
+#               (nenhum campo) ou a máscara dos campos 1-5 que mudaram
+#   campos      varints zigzag (absolutos no SPAWN, diferenças nos outros)
+
+QUANT = 4 # Posições em quartos de pixel
+
+# Tipos de objeto replicados
+PLAYER = 0
+ENEMY = 1
+FLYER = 2
+PLATFORM = 3 # Só as plataformas móveis (as paradas o cliente lê da fase)
+COIN = 4
+
+FIELDS = 6 # tipo, x, y, frame, vida, pontos
+SPAWN = 0x80
+REMOVE = 0x40
+NO_FRAME = 0 # Frame guardado como índice do atlas + 1 (0 = imagem fora do atlas)
+
+
+# Função que monta o estado quantizado de um ator
+def entity_state(kind, actor, health=0, score=0):
+    frame = actor.frame + 1 if actor.frame is not None else NO_FRAME
+    return (kind, int(round(actor.x * QUANT)), int(round(actor.y * QUANT)), frame, health, score)
+
+
+# Função que grava um inteiro sem sinal como varint no fim de out
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+# Função que lê um varint e devolve (valor, posição seguinte)
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+# Zigzag: números com sinal viram sem sinal (0, -1, 1, -2... -> 0, 1, 2, 3...)
+def zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+# Função que codifica a diferença entre um estado e a base (bytes)
+def encode_delta(state, baseline):
+    body = bytearray()
+    count = 0
+    previous_id = 0
+    for entity_id in sorted(state.keys() | baseline.keys()):
+        new = state.get(entity_id)
+        old = baseline.get(entity_id)
+        if new == old:
+            continue
+        write_varint(body, entity_id - previous_id)
+        previous_id = entity_id
+        count += 1
+        if new is None:
+            body.append(REMOVE)
+        elif old is None or old[0] != new[0]:
+            body.append(SPAWN)
+            for value in new:
+                write_varint(body, zigzag(value))
+        else:
+            mask = 0
+            for field in range(1, FIELDS):
+                if new[field] != old[field]:
+                    mask |= 1 << (field - 1)
+            body.append(mask)
+            for field in range(1, FIELDS):
+                if new[field] != old[field]:
+                    write_varint(body, zigzag(new[field] - old[field]))
+    out = bytearray()
+    write_varint(out, count)
+    return bytes(out + body)
+
+
+# Função que aplica uma diferença (a partir de offset) sobre a base e devolve o estado novo
+def decode_delta(data, baseline, offset=0):
+    state = dict(baseline)
+    count, offset = read_varint(data, offset)
+    entity_id = 0
+    for _ in range(count):
+        step, offset = read_varint(data, offset)
+        entity_id += step
+        flags = data[offset]
+        offset += 1
+        if flags == REMOVE:
+            state.pop(entity_id, None)
+        elif flags == SPAWN:
+            values = []
+            for _ in range(FIELDS):
+                value, offset = read_varint(data, offset)
+                values.append(unzigzag(value))
+            state[entity_id] = tuple(values)
+        else:
+            values = list(state[entity_id])
+            for field in range(1, FIELDS):
+                if flags & (1 << (field - 1)):
+                    value, offset = read_varint(data, offset)
+                    values[field] += unzigzag(value)
+            state[entity_id] = tuple(values)
+    return state
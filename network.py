@@ -0,0 +1,498 @@
+import json
+import platform
+import random
+import socket
+import struct
+import sys
+import time
+import tracemalloc
+from collections import deque, namedtuple
+
+from simulation import (Game, Player, InputState, FlyingEnemy, PHYSICS_HZ, WIDTH, HEIGHT,
+                        LOAD_RADIUS, VIEW_MARGIN)
+from netcode import (entity_state, encode_delta, decode_delta, QUANT,
+                     PLAYER, ENEMY, FLYER, PLATFORM, COIN)
+from profiler import percentile
+
+# Multijogador pela rede (UDP), com um servidor que é o dono do jogo. O
+# servidor roda um Game com vários jogadores em ticks fixos: a cada tick ele
+# lê as teclas que chegaram de cada cliente, avança a simulação (com o mesmo
+# passo fixo da física do jogo) e manda para cada cliente uma fotografia do
+# que está perto do jogador dele (jogadores, inimigos, plataformas móveis e
+# moedas), codificada como diferença em relação à última fotografia que o
+# cliente confirmou (netcode.py). Como só vai o que está perto, os bytes por
+# cliente não crescem com o tamanho da fase. Pacote perdido não precisa ser
+# reenviado: a próxima diferença é calculada de novo a partir da última base
+# confirmada.
+#
+# O cliente guarda as fotografias que recebe e desenha um pouco no passado
+# (INTERPOLATION_TICKS), interpolando as posições entre as duas fotografias
+# em volta do instante desenhado, para o movimento sair liso com poucos
+# pacotes por segundo.
+#
+# Pacotes (little-endian):
+#   cliente -> servidor   JOIN, LEAVE ou INPUT + última fotografia recebida (I)
+#                         + número do pacote (I) + teclas (B)
+#   servidor -> cliente   WELCOME + id do jogador (I) + ticks por segundo (H)
+#                         SNAPSHOT + número (I) + base (I) + tick (I) + diferença
+#
+# Uso:
+#   python network.py server [porta] [fase]        servidor em 127.0.0.1
+#   python network.py bot [porta] [segundos]       cliente de teste que corre e pula
+#   python network.py soak [saída.json] [clientes] [ticks]
+#                                                  teste de carga em fases de vários tamanhos
+
+DEFAULT_PORT = 25565
+TICK_HZ = 30 # Ticks do servidor (e fotografias enviadas) por segundo
+INTERPOLATION_TICKS = 2 # Atraso do desenho no cliente, em ticks
+HISTORY = 64 # Fotografias guardadas por cliente (bases possíveis)
+CLIENT_TIMEOUT = 5 # Segundos sem notícias até o cliente sair
+TICK_HISTORY = 600 # Durações de tick guardadas (20 segundos)
+MAX_PACKET = 65507 # Maior pacote UDP
+START_POS = (100, HEIGHT - 100) # Onde os jogadores entram e renascem
+RELEVANT_WIDTH = WIDTH + 2 * VIEW_MARGIN # Área em volta do jogador que vai na fotografia
+RELEVANT_HEIGHT = HEIGHT + 2 * VIEW_MARGIN
+
+JOIN = 1
+LEAVE = 2
+INPUT = 3
+WELCOME = 4
+SNAPSHOT = 5
+NO_BASE = 0xFFFFFFFF # Fotografia completa (sem base)
+
+INPUT_PACKET = struct.Struct('<BIIB')
+WELCOME_PACKET = struct.Struct('<BIH')
+SNAPSHOT_HEADER = struct.Struct('<BIII')
+
+# Retângulo usado nas consultas aos índices espaciais
+Box = namedtuple('Box', ['left', 'top', 'width', 'height'])
+
+SOAK_SIZES = (100, 1000, 10000) # Plataformas das fases geradas no teste de carga
+SOAK_CLIENTS = 8
+SOAK_TICKS = 900 # 30 segundos de jogo
+SOAK_LOSS = 0.05 # Fração das fotografias que os clientes simulados perdem
+DEFAULT_OUTPUT = 'soak.json'
+
+
+# Classe do jogo com vários jogadores: o mundo é um só, cada jogador tem as
+# próprias teclas, vida e pontos. Quem perde a vida ou chega na plataforma
+# final renasce no início (os pontos continuam).
+class ServerGame(Game):
+    def __init__(self, **options):
+        self.players = {} # Id -> Player
+        self.player_inputs = {} # Id -> teclas do último pacote
+        super().__init__(**options)
+        self.state = 'PLAYING'
+
+    def add_player(self, player_id):
+        player = self.players[player_id] = Player()
+        player.reset(START_POS)
+        player.max_x = self.level.width - 50
+        self.player_inputs[player_id] = InputState()
+        return player
+
+    def remove_player(self, player_id):
+        self.players.pop(player_id, None)
+        self.player_inputs.pop(player_id, None)
+
+    # Ficam carregados os pedaços em volta de todos os jogadores
+    def stream_chunks(self):
+        size = self.level.chunk_size
+        players = list(self.players.values()) or [self.player]
+        wanted = {index for player in players
+                  for index in range(int(player.actor.x // size) - LOAD_RADIUS,
+                                     int(player.actor.x // size) + LOAD_RADIUS + 1)
+                  if index in self.level.chunk_ids}
+        return self.load_chunks(wanted)
+
+    # Mesmo passo do Game, para todos os jogadores
+    def step(self, dt, inputs=None):
+        self.update(dt)
+        for player_id, player in self.players.items():
+            self.handle_input(dt, player, self.player_inputs[player_id])
+        return self.observe()
+
+    def update(self, dt):
+        self.frame_count += 1
+        self.clock.advance(dt)
+        self.stream_chunks()
+        for player_id, player in self.players.items():
+            player.update(dt, self.platform_index, self.player_inputs[player_id], self.clock.time)
+        self.update_entities(dt)
+        for player in self.players.values():
+            if self.check_collisions(player) is not None:
+                # Este jogador perdeu ou venceu: renasce no início, com os mesmos pontos
+                player.reset(START_POS, player.score)
+
+
+# Classe com o que o servidor sabe de um cliente
+class ClientSlot:
+    def __init__(self, player_id, now):
+        self.player_id = player_id
+        self.sequence = 0 # Número da última fotografia enviada
+        self.ack = None # Última fotografia que o cliente confirmou
+        self.input_sequence = -1 # Número do último pacote de teclas usado
+        self.history = {} # Número -> estado enviado (bases possíveis)
+        self.last_heard = now
+        self.bytes_sent = 0
+
+
+# Classe do servidor: recebe as teclas, avança o jogo em ticks fixos e manda as fotografias
+class Server:
+    def __init__(self, port=DEFAULT_PORT, host='127.0.0.1', tick_hz=TICK_HZ, tick_history=TICK_HISTORY,
+                 **game_options):
+        self.game = ServerGame(physics_hz=PHYSICS_HZ, **game_options)
+        self.tick_hz = tick_hz
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+        self.clients = {} # Endereço -> ClientSlot
+        self.entity_ids = {} # Chave do objeto na fase -> id na rede
+        self.next_id = 1
+        self.tick = 0
+        self.tick_times = deque(maxlen=tick_history) # Duração dos últimos ticks (segundos)
+
+    # Devolve o id de rede de um objeto da fase (o mesmo depois de descarregado e recarregado)
+    def entity_id(self, key):
+        entity_id = self.entity_ids.get(key)
+        if entity_id is None:
+            entity_id = self.entity_ids[key] = self.next_id
+            self.next_id += 1
+        return entity_id
+
+    # Lê todos os pacotes que chegaram
+    def poll(self):
+        now = time.perf_counter()
+        while True:
+            try:
+                data, address = self.socket.recvfrom(MAX_PACKET)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            kind = data[0] if data else None
+            client = self.clients.get(address)
+            if kind == JOIN:
+                if client is None:
+                    client = self.clients[address] = ClientSlot(self.entity_id(('player', address)), now)
+                    self.game.add_player(client.player_id)
+                self.socket.sendto(WELCOME_PACKET.pack(WELCOME, client.player_id, self.tick_hz), address)
+            elif client is None:
+                continue
+            elif kind == LEAVE:
+                self.disconnect(address)
+            elif kind == INPUT and len(data) == INPUT_PACKET.size:
+                kind, ack, sequence, mask = INPUT_PACKET.unpack(data)
+                client.last_heard = now
+                if ack != NO_BASE and ack in client.history and (client.ack is None or ack > client.ack):
+                    client.ack = ack
+                if sequence > client.input_sequence: # Pacotes atrasados não voltam no tempo
+                    client.input_sequence = sequence
+                    self.game.player_inputs[client.player_id] = InputState(bool(mask & 1), bool(mask & 2), bool(mask & 4))
+        for address in [a for a, c in self.clients.items() if now - c.last_heard > CLIENT_TIMEOUT]:
+            self.disconnect(address)
+
+    def disconnect(self, address):
+        client = self.clients.pop(address)
+        self.game.remove_player(client.player_id)
+
+    # Estado quantizado do que está perto de um jogador
+    def capture(self, player):
+        game = self.game
+        time_now = game.clock.time
+        state = {}
+        for player_id, other in game.players.items():
+            state[player_id] = entity_state(PLAYER, other.actor, other.health, other.score)
+        box = Box(player.actor.x - RELEVANT_WIDTH / 2, -VIEW_MARGIN, RELEVANT_WIDTH, RELEVANT_HEIGHT)
+        for plat in game.platform_index.query(box):
+            if plat.moving:
+                state[self.entity_id(plat.level_key)] = entity_state(PLATFORM, plat)
+        for coin in game.coin_index.query(box):
+            coin.animation.apply(coin, time_now)
+            state[self.entity_id(coin.level_key)] = entity_state(COIN, coin)
+        enemies = game.enemy_index.query(box)
+        if game.batch is not None:
+            game.batch.sync(enemies)
+        for enemy in enemies:
+            enemy.actor.animation.apply(enemy.actor, time_now)
+            kind = FLYER if isinstance(enemy, FlyingEnemy) else ENEMY
+            state[self.entity_id(enemy.level_key)] = entity_state(kind, enemy.actor)
+        return state
+
+    # Manda a fotografia do tick para um cliente, como diferença da última base confirmada
+    def send_snapshot(self, address, client):
+        state = self.capture(self.game.players[client.player_id])
+        client.sequence += 1
+        baseline = client.history.get(client.ack) if client.ack is not None else None
+        base = client.ack if baseline is not None else NO_BASE
+        packet = SNAPSHOT_HEADER.pack(SNAPSHOT, client.sequence, base, self.tick) + encode_delta(state, baseline or {})
+        self.socket.sendto(packet, address)
+        client.bytes_sent += len(packet)
+        client.history[client.sequence] = state
+        client.history.pop(client.sequence - HISTORY, None)
+
+    # Um tick: lê as teclas, avança o jogo e manda as fotografias
+    def step(self):
+        start = time.perf_counter()
+        self.poll()
+        self.game.advance(1 / self.tick_hz)
+        self.tick += 1
+        for address, client in list(self.clients.items()):
+            self.send_snapshot(address, client)
+        self.tick_times.append(time.perf_counter() - start)
+
+    # Roda em tempo real (para sempre ou pelo tempo dado). Se um tick
+    # atrasar, os seguintes não dormem até recuperar, sem acumular mais que um segundo.
+    def run(self, duration=None):
+        interval = 1 / self.tick_hz
+        start = next_tick = time.perf_counter()
+        while duration is None or next_tick - start < duration:
+            self.step()
+            next_tick += interval
+            now = time.perf_counter()
+            if next_tick > now:
+                time.sleep(next_tick - now)
+            elif now - next_tick > 1:
+                next_tick = now
+
+    def close(self):
+        self.socket.close()
+
+
+# Classe do cliente: manda as teclas, recebe as fotografias e interpola as posições
+class Client:
+    def __init__(self, server_address, loss=0.0, seed=None):
+        self.server_address = server_address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((server_address[0], 0))
+        self.socket.setblocking(False)
+        self.player_id = None
+        self.tick_hz = TICK_HZ
+        self.snapshots = {} # Número -> estado (bases para as próximas diferenças)
+        self.ack = None # Maior fotografia recebida
+        self.timeline = [] # (tick, estado) das fotografias recebidas, em ordem de tick
+        self.received_at = None # (tick mais novo, hora em que chegou)
+        self.input_sequence = 0
+        self.loss = loss # Fração de fotografias descartadas de propósito (para testes)
+        self.random = random.Random(seed)
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.lost = 0 # Fotografias descartadas ou sem base
+
+    def send(self, packet):
+        self.socket.sendto(packet, self.server_address)
+        self.bytes_sent += len(packet)
+
+    def join(self):
+        self.send(bytes([JOIN]))
+
+    def leave(self):
+        self.send(bytes([LEAVE]))
+
+    # Manda as teclas do quadro (com a confirmação da última fotografia)
+    def send_input(self, inputs):
+        mask = (1 if inputs.left else 0) | (2 if inputs.right else 0) | (4 if inputs.space else 0)
+        ack = self.ack if self.ack is not None else NO_BASE
+        self.input_sequence += 1
+        self.send(INPUT_PACKET.pack(INPUT, ack, self.input_sequence, mask))
+
+    # Lê todos os pacotes que chegaram
+    def receive(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(MAX_PACKET)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            self.bytes_received += len(data)
+            kind = data[0] if data else None
+            if kind == WELCOME and len(data) == WELCOME_PACKET.size:
+                kind, self.player_id, self.tick_hz = WELCOME_PACKET.unpack(data)
+            elif kind == SNAPSHOT and len(data) >= SNAPSHOT_HEADER.size:
+                if self.loss and self.random.random() < self.loss:
+                    self.lost += 1
+                    continue
+                kind, sequence, base, tick = SNAPSHOT_HEADER.unpack_from(data)
+                baseline = {} if base == NO_BASE else self.snapshots.get(base)
+                if baseline is None:
+                    self.lost += 1 # Base já esquecida: espera a próxima
+                    continue
+                state = decode_delta(data, baseline, SNAPSHOT_HEADER.size)
+                self.snapshots[sequence] = state
+                for old in [s for s in self.snapshots if s <= sequence - HISTORY]:
+                    del self.snapshots[old] # Bases velhas demais (o servidor também já esqueceu)
+                if self.ack is None or sequence > self.ack:
+                    self.ack = sequence
+                    self.received_at = (tick, time.perf_counter())
+                self.timeline.append((tick, state))
+                self.timeline.sort(key=lambda item: item[0])
+                del self.timeline[:-HISTORY]
+
+    # Tick do servidor que deve ser desenhado agora (um pouco no passado)
+    def render_tick(self, now=None):
+        if self.received_at is None:
+            return None
+        tick, arrival = self.received_at
+        now = time.perf_counter() if now is None else now
+        return tick + (now - arrival) * self.tick_hz - INTERPOLATION_TICKS
+
+    # Devolve id -> (tipo, x, y, frame, vida, pontos) no tick dado, com as
+    # posições interpoladas entre as fotografias em volta dele
+    def interpolated(self, tick=None):
+        if tick is None:
+            tick = self.render_tick()
+        if tick is None or not self.timeline:
+            return {}
+        older = newer = None
+        for entry in self.timeline:
+            if entry[0] <= tick:
+                older = entry
+            else:
+                newer = entry
+                break
+        if older is None or newer is None:
+            # Antes da primeira ou depois da última fotografia: sem interpolar
+            entry = older or newer
+            return {i: (s[0], s[1] / QUANT, s[2] / QUANT) + s[3:] for i, s in entry[1].items()}
+        fraction = (tick - older[0]) / (newer[0] - older[0])
+        result = {}
+        for entity_id, new in newer[1].items():
+            old = older[1].get(entity_id, new)
+            result[entity_id] = (new[0], (old[1] + (new[1] - old[1]) * fraction) / QUANT,
+                                 (old[2] + (new[2] - old[2]) * fraction) / QUANT) + new[3:]
+        return result
+
+    def close(self):
+        self.socket.close()
+
+
+# Classe que escolhe as teclas de um cliente simulado: corre para a direita
+# quase sempre, às vezes volta, e pula de tempos em tempos
+class Bot:
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+        self.left = False
+
+    def inputs(self, tick):
+        if tick % 15 == 0:
+            self.left = self.random.random() < 0.2
+        return InputState(left=self.left, right=not self.left, space=self.random.random() < 0.1)
+
+
+# Função que roda uma fase com clients clientes simulados, tick a tick (sem
+# esperar o tempo real), e devolve as medidas
+def soak_run(level, clients=SOAK_CLIENTS, ticks=SOAK_TICKS, loss=SOAK_LOSS, seed=0):
+    server = Server(port=0, level=level, seed=seed, tick_history=ticks)
+    bots = [Client(server.address, loss=loss, seed=seed + i) for i in range(clients)]
+    players = [Bot(seed + 100 + i) for i in range(clients)]
+    for bot in bots:
+        bot.join()
+    server.poll()
+
+    full_sizes = [] # Tamanho que a fotografia teria sem diferença (para comparar)
+    warmup = min(ticks // 2, 2 * HISTORY) # Ticks até os históricos encherem (fora das medidas)
+    tracemalloc.start()
+    memory_start = None
+    for tick in range(ticks):
+        for bot, player in zip(bots, players):
+            bot.receive()
+            bot.send_input(player.inputs(tick))
+        server.step()
+        if tick % 30 == 0:
+            client = next(iter(server.clients.values()))
+            full_sizes.append(len(encode_delta(client.history[client.sequence], {})))
+        if tick == warmup:
+            memory_start = tracemalloc.get_traced_memory()[0]
+    memory_end = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for bot in bots:
+        bot.receive()
+
+    game = server.game
+    seconds = ticks / server.tick_hz
+    times = sorted(list(server.tick_times)[warmup:])
+    sent = [client.bytes_sent for client in server.clients.values()]
+    entities = {'level_platforms': sum(len(game.level.load_chunk(i).platforms) for i in game.level.chunk_ids),
+                'loaded': len(game.platforms) + len(game.coins) + len(game.enemies) + len(game.flying_enemies),
+                'replicated_per_client': sum(len(client.history[client.sequence])
+                                             for client in server.clients.values()) / len(server.clients)}
+    result = {
+        'clients': clients, 'ticks': ticks, 'tick_hz': server.tick_hz, 'loss': loss,
+        'entities': entities,
+        'tick_ms': {'mean': sum(times) / len(times) * 1000, 'p50': percentile(times, 50) * 1000,
+                    'p95': percentile(times, 95) * 1000, 'p99': percentile(times, 99) * 1000,
+                    'max': times[-1] * 1000},
+        'down_bytes_per_second_per_client': sum(sent) / len(sent) / seconds,
+        'up_bytes_per_second_per_client': sum(bot.bytes_sent for bot in bots) / len(bots) / seconds,
+        'full_snapshot_bytes': sum(full_sizes) / len(full_sizes),
+        'delta_snapshot_bytes': sum(sent) / len(sent) / ticks,
+        'snapshots_lost_per_client': sum(bot.lost for bot in bots) / len(bots),
+        'memory_growth_kb': (memory_end - memory_start) / 1024,
+    }
+    for bot in bots:
+        bot.close()
+    server.close()
+    return result
+
+
+# Função que roda o teste de carga em fases geradas de vários tamanhos
+def soak(sizes=SOAK_SIZES, clients=SOAK_CLIENTS, ticks=SOAK_TICKS):
+    from generator import generate
+    from levels import JsonLevel
+    results = []
+    for count in sizes:
+        level = JsonLevel(generate(count, seed=count)[0])
+        results.append(dict(soak_run(level, clients, ticks), platforms=count))
+        report(results[-1])
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}
+
+
+# Função que mostra as medidas de um tamanho de fase
+def report(result):
+    tick = result['tick_ms']
+    print(f"{result['platforms']:>6} platforms, {result['clients']} clients "
+          f"({result['entities']['replicated_per_client']:.0f} replicated each): "
+          f"tick p50 {tick['p50']:.2f} p95 {tick['p95']:.2f} p99 {tick['p99']:.2f} ms | "
+          f"down {result['down_bytes_per_second_per_client'] / 1024:.1f} KB/s per client "
+          f"(delta {result['delta_snapshot_bytes']:.0f} B vs full {result['full_snapshot_bytes']:.0f} B) | "
+          f"up {result['up_bytes_per_second_per_client']:.0f} B/s | "
+          f"memory {result['memory_growth_kb']:+.0f} KB")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'server':
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+        server = Server(port=port, level=sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"Server listening on {server.address[0]}:{server.address[1]}")
+        try:
+            server.run()
+        except KeyboardInterrupt:
+            server.close()
+    elif command == 'bot':
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+        duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+        client = Client(('127.0.0.1', port))
+        client.join()
+        player = Bot()
+        start = time.perf_counter()
+        frame = 0
+        while time.perf_counter() - start < duration:
+            client.receive()
+            client.send_input(player.inputs(frame))
+            frame += 1
+            time.sleep(1 / 60)
+        me = client.interpolated().get(client.player_id)
+        client.leave()
+        print(f"player {client.player_id}: {me}, received {client.bytes_received / duration / 1024:.1f} KB/s")
+    elif command == 'soak':
+        output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT
+        clients = int(sys.argv[3]) if len(sys.argv) > 3 else SOAK_CLIENTS
+        ticks = int(sys.argv[4]) if len(sys.argv) > 4 else SOAK_TICKS
+        data = soak(clients=clients, ticks=ticks)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        print(f"Results saved to {output}")
+    else:
+        print("Usage: python network.py server [port] [level] | bot [port] [seconds] | "
+              "soak [out.json] [clients] [ticks]")
+        sys.exit(1)
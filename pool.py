@@ -0,0 +1,58 @@
+# Armazenamento de objetos com reaproveitamento (pool). Os objetos vivos
+# ficam juntos em uma lista, sem buracos, então percorrer o pool só passa por
+# eles. Remover é O(1): o último objeto da lista ocupa a posição do removido
+# (swap-remove). Os removidos vão para uma lista de livres e são reutilizados
+# (com reset) na próxima vez que um objeto do mesmo tipo for pedido, em vez
+# de criar outro; ao reiniciar o jogo todos os objetos voltam para os livres.
+#
+# Os objetos guardam a própria posição na lista em pool_slot (None = fora do pool).
+
+# Classe do pool de um tipo de objeto
+class EntityPool:
+    def __init__(self, factory):
+        self.factory = factory # Cria um objeto novo quando não há nenhum livre
+        self.items = [] # Objetos vivos, sem buracos
+        self.free = [] # Objetos soltos, prontos para reaproveitar
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, item):
+        slot = getattr(item, 'pool_slot', None)
+        return slot is not None and slot < len(self.items) and self.items[slot] is item
+
+    # Devolve um objeto vivo: reaproveita um livre (chamando reset com os
+    # argumentos) ou cria um novo com a fábrica
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            item = self.free.pop()
+            item.reset(*args, **kwargs)
+        else:
+            item = self.factory(*args, **kwargs)
+        self.add(item)
+        return item
+
+    # Coloca no pool um objeto criado fora dele
+    def add(self, item):
+        item.pool_slot = len(self.items)
+        self.items.append(item)
+
+    # Remove um objeto vivo em O(1), colocando o último no lugar dele
+    def release(self, item):
+        slot = item.pool_slot
+        last = self.items.pop()
+        if last is not item:
+            self.items[slot] = last
+            last.pool_slot = slot
+        item.pool_slot = None
+        self.free.append(item)
+
+    # Solta todos os objetos vivos de uma vez (usado ao reiniciar)
+    def release_all(self):
+        for item in self.items:
+            item.pool_slot = None
+        self.free.extend(self.items)
+        self.items.clear()
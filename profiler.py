@@ -0,0 +1,159 @@
+import csv
+import json
+import sys
+from time import perf_counter
+
+# Medidor de tempo por fase do quadro. Cada fase (fundo, plataformas, moedas,
+# inimigos, física do jogador, colisões, HUD...) é medida com marcas: mark(fase)
+# soma à fase o tempo desde a marca anterior. Os tempos de cada quadro vão
+# para um buffer circular com os últimos N quadros, de onde saem os
+# percentis mostrados na tela e os arquivos CSV/JSON para comparar versões.
+#
+# Para comparar dois perfis exportados:
+#   python profiler.py antes.json depois.json
+
+# Fases medidas, na ordem em que acontecem no quadro
+# ('compose' = montagem da tela no modo de retângulos sujos)
+PHASES = ('physics', 'entities', 'collisions', 'background', 'culling',
+          'platforms', 'coins', 'player', 'enemies', 'hud', 'compose')
+
+HISTORY_SIZE = 600 # Quadros guardados no buffer (10 segundos a 60 FPS)
+SUMMARY_INTERVAL = 30 # Quadros entre um recálculo e outro dos percentis
+
+
+# Função que devolve o percentil p (0 a 100) de uma lista já ordenada
+def percentile(values, p):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))
+    return values[index]
+
+
+# Classe que não mede nada (usada quando o jogo roda sem medidor)
+class NullProfiler:
+    visible = False
+
+    def begin_frame(self):
+        pass
+
+    def start(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+
+# Classe que mede o tempo de cada fase e guarda os últimos quadros
+class FrameProfiler:
+    def __init__(self, phases=PHASES, size=HISTORY_SIZE):
+        self.phases = tuple(phases)
+        self.columns = ('frame',) + self.phases # 'frame' = tempo total entre dois quadros
+        self.size = size
+        self.samples = {name: [0.0] * size for name in self.columns} # Buffer circular por coluna
+        self.cursor = 0 # Posição onde entra o próximo quadro
+        self.count = 0 # Quantos quadros já estão no buffer
+        self.row = dict.fromkeys(self.phases, 0.0) # Tempos do quadro atual
+        self.frame_start = None # Início do quadro atual
+        self.last = perf_counter() # Momento da última marca
+        self.visible = False # Se o resumo aparece na tela
+        self.cached_summary = None
+        self.frames_since_summary = 0
+
+    # Fecha o quadro anterior (guardando no buffer) e começa um novo
+    def begin_frame(self):
+        now = perf_counter()
+        if self.frame_start is not None:
+            samples = self.samples
+            cursor = self.cursor
+            samples['frame'][cursor] = now - self.frame_start
+            for phase, value in self.row.items():
+                samples[phase][cursor] = value
+                self.row[phase] = 0.0
+            self.cursor = (cursor + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+            self.frames_since_summary += 1
+        self.frame_start = now
+        self.last = now
+
+    # Recomeça a contagem sem somar o tempo passado a nenhuma fase
+    def start(self):
+        self.last = perf_counter()
+
+    # Soma à fase o tempo desde a última marca
+    def mark(self, phase):
+        now = perf_counter()
+        self.row[phase] += now - self.last
+        self.last = now
+
+    # Devolve os valores guardados de uma coluna, do quadro mais antigo ao mais novo
+    def history(self, name):
+        values = self.samples[name]
+        if self.count < self.size:
+            return values[:self.count]
+        return values[self.cursor:] + values[:self.cursor]
+
+    # Calcula média e percentis (em milissegundos) de cada coluna
+    def summary(self):
+        result = {}
+        for name in self.columns:
+            values = sorted(self.history(name))
+            result[name] = {
+                'mean': sum(values) / len(values) * 1000 if values else 0.0,
+                'p50': percentile(values, 50) * 1000,
+                'p95': percentile(values, 95) * 1000,
+                'p99': percentile(values, 99) * 1000,
+                'max': values[-1] * 1000 if values else 0.0,
+            }
+        return result
+
+    # Linhas (nome, valores) do resumo mostrado na tela, recalculado de tempos em tempos
+    def overlay_rows(self):
+        if self.cached_summary is None or self.frames_since_summary >= SUMMARY_INTERVAL:
+            self.cached_summary = self.summary()
+            self.frames_since_summary = 0
+        stats = self.cached_summary
+        frame = stats['frame']
+        rows = [('frame ms', f"p50 {frame['p50']:.2f}  p95 {frame['p95']:.2f}  p99 {frame['p99']:.2f}")]
+        for phase in self.phases:
+            rows.append((phase, f"avg {stats[phase]['mean']:.3f}  p95 {stats[phase]['p95']:.3f}"))
+        return rows
+
+    # Grava os quadros do buffer em CSV (um quadro por linha, tempos em ms)
+    def export_csv(self, path):
+        columns = [self.history(name) for name in self.columns]
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            for row in zip(*columns):
+                writer.writerow([f"{value * 1000:.4f}" for value in row])
+
+    # Grava o resumo e os quadros do buffer em JSON (tempos em ms)
+    def export_json(self, path):
+        data = {
+            'frames': self.count,
+            'summary': self.summary(),
+            'samples': {name: [round(value * 1000, 4) for value in self.history(name)]
+                        for name in self.columns},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+
+
+# Função que mostra, fase por fase, a diferença entre dois perfis exportados em JSON
+def compare(before_path, after_path):
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)['summary']
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)['summary']
+    print(f"{'phase':<12}{'p50 before':>12}{'p50 after':>12}{'p95 before':>12}{'p95 after':>12}")
+    for name in before:
+        if name in after:
+            print(f"{name:<12}{before[name]['p50']:>12.3f}{after[name]['p50']:>12.3f}"
+                  f"{before[name]['p95']:>12.3f}{after[name]['p95']:>12.3f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python profiler.py <before.json> <after.json>")
+        sys.exit(1)
+    compare(sys.argv[1], sys.argv[2])
@@ -0,0 +1,213 @@
+import struct
+import sys
+import time
+import zlib
+
+# Gravação e reprodução de partidas. Aberto com python game.py --record, o
+# jogo grava em um log binário só de acréscimo (append-only) tudo o que muda
+# a simulação: a semente de cada partida, o clique em "Começar jogo" e, a
+# cada quadro, as teclas pressionadas e o dt. Como a simulação só depende
+# disso, reproduzir o log refaz a partida bit a bit, sem janela e mais rápido
+# que o tempo real (serve também como carga fixa para medir desempenho). De
+# tempos em tempos o log guarda uma soma de verificação do estado, para
+# conferir a reprodução.
+#
+# Formato (little-endian): cabeçalho 'KRPL' + versão (H), depois registros
+# que começam com um byte de tipo:
+#   quadro      bits 0-2 = esquerda/direita/espaço, bit 3 = dt em ms (H),
+#               bit 4 = dt exato (d)
+#   início      0x20, sem dados (jogador clicou em "Começar jogo")
+#   partida     0x40 + semente (Q)
+#   verificação 0x80 + CRC32 do estado do jogo (I)
+#   checkpoint  0x60 + tamanho (I) + fotografia do estado (snapshot.py)
+#
+# Para reproduzir um log:
+#   python replay.py replay.rpl
+
+from simulation import Game, InputState, PHYSICS_HZ
+from snapshot import Snapshot
+
+MAGIC = b'KRPL'
+VERSION = 1
+HEADER = struct.Struct('<4sH')
+DT_MS = struct.Struct('<H')
+DT_EXACT = struct.Struct('<d')
+SEED = struct.Struct('<Q')
+CHECK = struct.Struct('<I')
+SIZE = struct.Struct('<I')
+
+LEFT = 1
+RIGHT = 2
+SPACE = 4
+FRAME_MS = 8 # Quadro com dt em milissegundos inteiros (o caso do pgzero)
+FRAME_EXACT = 16 # Quadro com dt qualquer
+START = 32
+SESSION = 64
+CHECKSUM = 128
+RESTORE = SESSION | START # Checkpoint carregado no meio da partida
+
+CHECK_INTERVAL = 60 # Quadros entre duas somas de verificação
+DEFAULT_LOG = 'replay.rpl'
+
+
+# Função que junta as teclas em um byte
+def input_mask(inputs):
+    return (LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) | (SPACE if inputs.space else 0)
+
+
+# Função que calcula a soma de verificação do estado do jogo (repr dos floats é exato)
+def checksum(game):
+    return zlib.crc32(repr(game.observe()).encode('utf-8'))
+
+
+# Classe que grava a partida no log (o arquivo é refeito a cada vez que o jogo abre)
+class Recorder:
+    def __init__(self, path=DEFAULT_LOG):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.frames_since_check = 0
+
+    # Começa uma partida nova (o jogo foi criado ou reiniciado com esta semente)
+    def begin_session(self, seed):
+        self.file.write(bytes([SESSION]) + SEED.pack(seed))
+        self.file.flush()
+        self.frames_since_check = 0
+
+    # Marca o clique em "Começar jogo"
+    def start(self):
+        self.file.write(bytes([START]))
+
+    # Grava a fotografia de um checkpoint que acabou de ser carregado
+    def restore(self, data):
+        self.file.write(bytes([RESTORE]) + SIZE.pack(len(data)) + data)
+        self.file.flush()
+        self.frames_since_check = 0
+
+    # Grava as teclas e o dt de um quadro (antes de avançar a simulação)
+    def frame(self, inputs, dt):
+        mask = input_mask(inputs)
+        ms = int(round(dt * 1000))
+        if 0 <= ms <= 0xFFFF and ms / 1000.0 == dt:
+            self.file.write(bytes([mask | FRAME_MS]) + DT_MS.pack(ms))
+        else:
+            self.file.write(bytes([mask | FRAME_EXACT]) + DT_EXACT.pack(dt))
+        self.frames_since_check += 1
+
+    # Grava a soma de verificação do estado de tempos em tempos (depois de avançar)
+    def check(self, game):
+        if self.frames_since_check >= CHECK_INTERVAL:
+            self.file.write(bytes([CHECKSUM]) + CHECK.pack(checksum(game)))
+            self.file.flush()
+            self.frames_since_check = 0
+
+    def close(self):
+        self.file.close()
+
+
+# Classe que não grava nada (usada quando o jogo roda sem --record)
+class NullRecorder:
+    def begin_session(self, seed):
+        pass
+
+    def start(self):
+        pass
+
+    def restore(self, data):
+        pass
+
+    def frame(self, inputs, dt):
+        pass
+
+    def check(self, game):
+        pass
+
+    def close(self):
+        pass
+
+
+# Função que lê os registros do log: ('session', semente), ('start', None),
+# ('frame', (teclas, dt)), ('check', crc) ou ('restore', bytes da fotografia).
+# Um registro cortado no fim (jogo fechado no meio da gravação) é ignorado.
+def read_log(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size or HEADER.unpack_from(data)[0] != MAGIC:
+        raise ValueError(f"{path} is not a replay file")
+    if HEADER.unpack_from(data)[1] != VERSION:
+        raise ValueError(f"{path} is not a replay file (version {VERSION})")
+    offset = HEADER.size
+    while offset < len(data):
+        tag = data[offset]
+        offset += 1
+        if tag & (FRAME_MS | FRAME_EXACT):
+            record = DT_MS if tag & FRAME_MS else DT_EXACT
+            if offset + record.size > len(data):
+                return
+            value = record.unpack_from(data, offset)[0]
+            dt = value / 1000.0 if tag & FRAME_MS else value
+            yield 'frame', (InputState(bool(tag & LEFT), bool(tag & RIGHT), bool(tag & SPACE)), dt)
+            offset += record.size
+        elif tag == START:
+            yield 'start', None
+        elif tag == RESTORE:
+            if offset + SIZE.size > len(data):
+                return
+            size = SIZE.unpack_from(data, offset)[0]
+            offset += SIZE.size
+            if offset + size > len(data):
+                return
+            yield 'restore', data[offset:offset + size]
+            offset += size
+        elif tag in (SESSION, CHECKSUM):
+            record = SEED if tag == SESSION else CHECK
+            if offset + record.size > len(data):
+                return
+            yield ('session' if tag == SESSION else 'check'), record.unpack_from(data, offset)[0]
+            offset += record.size
+        else:
+            raise ValueError(f"corrupt replay record at byte {offset - 1}")
+
+
+# Função que reproduz um log sem janela, o mais rápido possível. Devolve o
+# jogo no estado final e um resumo (quadros, tempo de jogo, tempo gasto,
+# verificações que bateram e que falharam).
+def play(path, **game_options):
+    game = None
+    stats = {'sessions': 0, 'frames': 0, 'game_time': 0.0, 'checks': 0, 'mismatches': 0}
+    start_time = time.perf_counter()
+    for kind, value in read_log(path):
+        if kind == 'frame':
+            inputs, dt = value
+            game.advance(dt, inputs)
+            stats['frames'] += 1
+            stats['game_time'] += dt
+        elif kind == 'session':
+            if game is None:
+                game = Game(physics_hz=PHYSICS_HZ, seed=value, **game_options)
+            else:
+                game.__init__(keep_music_state=True, keep_sound_state=True, seed=value)
+            stats['sessions'] += 1
+        elif kind == 'start':
+            game.state = 'PLAYING'
+        elif kind == 'restore':
+            game.restore(Snapshot.from_bytes(value))
+        elif kind == 'check':
+            stats['checks'] += 1
+            if checksum(game) != value:
+                stats['mismatches'] += 1
+    stats['elapsed'] = time.perf_counter() - start_time
+    return game, stats
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python replay.py <replay.rpl>")
+        sys.exit(1)
+    game, stats = play(sys.argv[1])
+    speed = stats['game_time'] / stats['elapsed'] if stats['elapsed'] else 0
+    print(f"{stats['sessions']} sessions, {stats['frames']} frames, "
+          f"{stats['game_time']:.1f}s of play replayed in {stats['elapsed']:.2f}s ({speed:.0f}x real time)")
+    print(f"checks: {stats['checks'] - stats['mismatches']}/{stats['checks']} match")
+    if game is not None:
+        print(game.observe())
+    sys.exit(1 if stats['mismatches'] else 0)
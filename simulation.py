@@ -0,0 +1,807 @@
+from math import sin # Função seno para movimentos suaves
+import os
+import random
+import struct # Para ler o tamanho das imagens direto do cabeçalho PNG
+from collections import namedtuple
+
+from spatial import SpatialHash, CELL_SIZE # Fase ampla das colisões
+from levels import load_level, DEFAULT_LEVEL # Fases carregadas de arquivo, em pedaços
+from camera import Camera # Câmera que segue o jogador
+import atlas # Tamanho e índice de cada frame no atlas de sprites
+from animation import Animation, AnimationClock, register_clip # Animações pelo relógio único
+from profiler import NullProfiler # Tempo de cada fase do quadro
+from pool import EntityPool # Objetos vivos sem buracos, reaproveitados entre partidas
+from snapshot import capture, restore as restore_snapshot # Fotografia do estado para reiniciar e checkpoints
+from collision import contact # Colisão pelos pixels dos frames, depois do teste dos retângulos
+
+# Núcleo da simulação do jogo, sem depender das variáveis globais do pgzero
+# (keyboard, sounds, music, Actor). Pode rodar sem janela e sem decodificar
+# imagens, o que permite simular milhares de frames por segundo.
+
+# Configurações gerais do jogo
+WIDTH = 800
+HEIGHT = 600
+
+# Configurações do passo fixo da física
+PHYSICS_HZ = 120 # Passos de física por segundo
+MAX_STEPS_PER_FRAME = 8 # Limite de passos por frame desenhado (evita a "espiral da morte")
+
+# Quantos pedaços da fase ficam carregados de cada lado do pedaço do jogador
+LOAD_RADIUS = 1
+
+# Margem em volta da câmera (em pixels) em que os objetos contam como visíveis
+VIEW_MARGIN = 64
+
+# Margem das consultas de colisão: o tamanho de um ator animado só é
+# atualizado quando ele é testado, então o índice pode estar alguns pixels atrás
+ANIMATION_MARGIN = 32
+
+# Pasta com as imagens do jogo (usada só para ler o tamanho de cada sprite)
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+
+_image_sizes = {} # Cache com o tamanho (largura, altura) de cada imagem
+
+
+# Função que devolve o tamanho de uma imagem pelos dados do atlas ou, se ela
+# não estiver no atlas, lendo só o cabeçalho do PNG
+def image_size(name):
+    size = _image_sizes.get(name)
+    if size is None:
+        index = atlas.frame_index(name)
+        if index is not None:
+            size = atlas.FRAME_RECTS[index][2:]
+        else:
+            with open(os.path.join(IMAGES_DIR, name + '.png'), 'rb') as f:
+                header = f.read(24)
+            size = struct.unpack('>II', header[16:24]) # Largura e altura do bloco IHDR
+        _image_sizes[name] = size
+    return size
+
+
+# Estado das teclas usadas pelo jogo em um frame
+InputState = namedtuple('InputState', ['left', 'right', 'space'], defaults=[False, False, False])
+
+# Estado observável do jogo devolvido por Game.step
+Observation = namedtuple('Observation', ['x', 'y', 'velocity_y', 'health', 'score', 'state'])
+
+
+# Clipes de animação, registrados uma vez e usados por todos os objetos
+COIN_SPIN = register_clip('coin_spin', ['coin_1', 'coin_2', 'coin_3'], 0.1)
+ENEMY_IDLE = register_clip('enemy_idle', ['enemy_idle_1', 'enemy_idle_2', 'enemy_idle_3'], 0.15)
+FLYER_LEFT = register_clip('flyer_left', ['flying_enemy_1', 'flying_enemy_2', 'flying_enemy_3'], 0.15)
+FLYER_RIGHT = register_clip('flyer_right', ['flying_enemy_1_flip', 'flying_enemy_2_flip', 'flying_enemy_3_flip'], 0.15)
+HERO_IDLE_RIGHT = register_clip('hero_idle_right', ['hero_idle_1', 'hero_idle_2', 'hero_idle_3', 'hero_idle_4'], 0.2)
+HERO_IDLE_LEFT = register_clip('hero_idle_left', ['hero_idle_1_flip', 'hero_idle_2_flip', 'hero_idle_3_flip', 'hero_idle_4_flip'], 0.2)
+HERO_RUN_RIGHT = register_clip('hero_run_right', ['hero_run_1', 'hero_run_2', 'hero_run_3', 'hero_run_4'], 0.2)
+HERO_RUN_LEFT = register_clip('hero_run_left', ['hero_run_1_flip', 'hero_run_2_flip', 'hero_run_3_flip', 'hero_run_4_flip'], 0.2)
+HERO_JUMP_RIGHT = register_clip('hero_jump_right', ['hero_jump'], 0.2)
+HERO_JUMP_LEFT = register_clip('hero_jump_left', ['hero_jump_flip'], 0.2)
+
+
+# Classe de áudio que não toca nada (usada na simulação sem janela)
+class NullAudio:
+    def play(self, name):
+        pass
+
+    def play_music(self, name, volume):
+        pass
+
+    def pause_music(self):
+        pass
+
+    def unpause_music(self, volume):
+        pass
+
+    def stop_music(self):
+        pass
+
+
+# Classe que imita o Actor do pgzero: um retângulo com posição pelo centro e
+# o nome da imagem, sem carregar a imagem em si
+class Actor:
+    def __init__(self, image, pos=(0, 0)):
+        self._image = image
+        self.frame = atlas.frame_index(image) # Índice do frame no atlas (usado no desenho)
+        self.width, self.height = image_size(image)
+        self.x, self.y = pos
+        self.animation = None # Animação que define a imagem (None = imagem fixa)
+
+    # Nome da imagem atual; trocar de imagem mantém o centro, como no pgzero
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, image):
+        if image != self._image:
+            self._image = image
+            self.frame = atlas.frame_index(image)
+            self.width, self.height = image_size(image)
+
+    @property
+    def pos(self):
+        return (self.x, self.y)
+
+    @pos.setter
+    def pos(self, pos):
+        self.x, self.y = pos
+
+    @property
+    def left(self):
+        return self.x - self.width / 2
+
+    @left.setter
+    def left(self, value):
+        self.x = value + self.width / 2
+
+    @property
+    def right(self):
+        return self.x + self.width / 2
+
+    @right.setter
+    def right(self, value):
+        self.x = value - self.width / 2
+
+    @property
+    def top(self):
+        return self.y - self.height / 2
+
+    @top.setter
+    def top(self, value):
+        self.y = value + self.height / 2
+
+    @property
+    def bottom(self):
+        return self.y + self.height / 2
+
+    @bottom.setter
+    def bottom(self, value):
+        self.y = value - self.height / 2
+
+    @property
+    def topleft(self):
+        return (self.left, self.top)
+
+    # Verifica se o retângulo encosta em outro (mesma regra do pgzero)
+    def colliderect(self, other):
+        return (
+            self.left < other.left + other.width and
+            self.top < other.top + other.height and
+            self.left + self.width > other.left and
+            self.top + self.height > other.top
+        )
+
+
+# Classe que representa as plataformas do jogo
+class Platform(Actor):
+    def __init__(self, image, pos, moving=False, move_range=0, is_final=False):
+        super().__init__(image, pos) # Inicializa a classe pai (Actor)
+        self.reset(image, pos, moving, move_range, is_final)
+
+    # Prepara a plataforma (nova ou reaproveitada do pool) com os dados da fase
+    def reset(self, image, pos, moving=False, move_range=0, is_final=False):
+        self.image = image
+        self.pos = pos
+        self.moving = moving # Indica se a plataforma se move
+        self.move_range = move_range # Alcance do movimento
+        self.start_x = pos[0] # Posição inicial X
+        self.direction = 1 # Direção do movimento (1 = direita, -1 = esquerda)
+        self.is_final = is_final # Indica se é a plataforma final
+        self.level_key = None # Identificação na fase (pedaço, tipo, índice)
+
+
+# Atualiza a posição da plataforma se ela for móvel
+    def update(self, dt):
+        if self.moving:
+            self.x += self.direction * 100 * dt # Move a plataforma
+            # Inverte a direção se atingir o limite do alcance
+            if abs(self.x - self.start_x) > self.move_range:
+                self.direction *= -1
+
+# Classe que representa as moedas coletáveis
+class Coin(Actor):
+    def __init__(self, pos, phase=0):
+        super().__init__('coin_1', pos) # Inicializa com o primeiro frame da moeda
+        self.animation = Animation(COIN_SPIN, phase) # Animação da moeda girando
+        self.level_key = None # Identificação na fase (pedaço, tipo, índice)
+
+    # Prepara a moeda reaproveitada do pool
+    def reset(self, pos, phase=0):
+        self.image = 'coin_1'
+        self.pos = pos
+        self.animation.phase = phase
+        self.level_key = None
+
+# Classe que representa o jogador
+class Player:
+    def __init__(self):
+        self.actor = Actor('hero_idle_1') # Cria o ator com a primeira imagem do personagem
+
+        # Animação do jogador; o clipe muda conforme o estado (parado, correndo, pulando)
+        self.animation = Animation(HERO_IDLE_RIGHT)
+        self.jump_strength = -500 # Força do pulo
+        self.gravity = 1300 # Gravidade
+        self.speed = 200 # Velocidade horizontal
+        self.max_x = WIDTH - 50 # Limite horizontal no chão (a fase pode ser maior que a tela)
+        self.jump_sound = 'jump' # Som do pulo
+        self.hurt_sound = 'hurt' # Som de dano
+        self.reset((100, HEIGHT - 100))
+
+    # Prepara o jogador para começar (ou, no multijogador, renascer): posição,
+    # movimento, animação e vida do início, com a pontuação dada
+    def reset(self, pos, score=0):
+        self.actor.image = 'hero_idle_1'
+        self.actor.pos = pos # Posição inicial
+        self.velocity_y = 0 # Velocidade vertical
+        self.jumping = False # Estado de pulo
+        self.facing_right = True # Direção que o personagem está olhando
+        self.animation.clip = HERO_IDLE_RIGHT
+        self.health = 3 # Vida do jogador
+        self.score = score # Pontuação
+        self.on_ground = False # Indica se está no chão
+
+
+    # Atualiza a posição e estado do jogador
+    def update(self, dt, platform_index, inputs, time):
+        prev_y = self.actor.y # Guarda posição Y anterior
+
+        # Aplica gravidade
+        self.velocity_y += self.gravity * dt
+        self.actor.y += self.velocity_y * dt
+
+        # Atualiza direção do sprite baseado no input
+        if inputs.left:
+            self.facing_right = False
+        elif inputs.right:
+            self.facing_right = True
+
+        self.on_ground = False
+
+        # Verifica colisão com as plataformas próximas
+        for platform in platform_index.query(self.actor):
+            if self.actor.colliderect(platform):
+                if self.velocity_y > 0 and prev_y <= platform.top:
+                    self.actor.bottom = platform.top
+                    self.velocity_y = 0
+                    self.jumping = False
+                    self.on_ground = True
+
+
+        # Mantém o jogador dentro dos limites da fase
+        if self.actor.bottom > HEIGHT - 100:
+            self.actor.bottom = HEIGHT - 100
+            self.actor.x = max(50, min(self.max_x, self.actor.x))
+            self.velocity_y = 0
+            self.jumping = False
+            self.on_ground = True
+
+       # Seleciona a animação apropriada baseada no estado
+        if self.jumping:
+            self.animation.clip = HERO_JUMP_RIGHT if self.facing_right else HERO_JUMP_LEFT
+        # Caso esteja correndo, muda a animação para a de corrida
+        elif inputs.left or inputs.right:
+            self.animation.clip = HERO_RUN_RIGHT if self.facing_right else HERO_RUN_LEFT
+        # Animação parada (idle)
+        else:
+            self.animation.clip = HERO_IDLE_RIGHT if self.facing_right else HERO_IDLE_LEFT
+        # O tamanho do jogador depende do frame, então a imagem é atualizada a cada passo
+        self.animation.apply(self.actor, time)
+
+
+# Classe que representa os inimigos terrestres
+class Enemy:
+    def __init__(self, x, y, phase=0, rng=random):
+        self.actor = Actor('enemy_idle_1') # Cria o ator com a primeira imagem do inimigo
+        self.actor.animation = Animation(ENEMY_IDLE, phase) # Animação parada do inimigo
+        self.reset(x, y, phase, rng)
+
+    # Prepara o inimigo (novo ou reaproveitado do pool) para começar a patrulha
+    def reset(self, x, y, phase=0, rng=random):
+        self.actor.image = 'enemy_idle_1'
+        self.actor.animation.phase = phase
+        self.actor.pos = (x, y) # Posição inicial
+        self.direction = 1 # Direção do movimento
+        self.patrol_time = 0 # Tempo de patrulha
+        self.patrol_range = 200 # Alcance da patrulha
+        self.speed = 150 # Velocidade de movimento
+        self.start_x = x # Posição inicial X
+        self.direction = rng.choice([-1, 1]) # Direção inicial aleatória (do gerador da partida)
+        self.active = True # Estado do inimigo
+        self.level_key = None # Identificação na fase (pedaço, tipo, índice)
+
+    # Atualiza posição e animação do inimigo
+    def update(self, dt, platforms):
+        if not self.active:
+            return
+
+        # Move o inimigo
+        new_x = self.actor.x + self.direction * self.speed * dt
+
+        # Verifica se atingiu o limite da patrulha
+        if abs(new_x - self.start_x) > self.patrol_range:
+            self.direction *= -1
+        else:
+            self.actor.x = new_x
+
+        # Inverte o sprite baseado na direção
+        self.actor.flip_x = (self.direction < 0)
+
+
+# Classe que representa os inimigos voadores
+class FlyingEnemy:
+    def __init__(self, x, y, phase=0):
+        self.actor = Actor('flying_enemy_1') # Cria o ator com a primeira imagem do inimigo voador
+        self.actor.animation = Animation(FLYER_RIGHT, phase) # Animação voando
+        self.reset(x, y, phase)
+
+    # Prepara o inimigo voador (novo ou reaproveitado do pool)
+    def reset(self, x, y, phase=0):
+        self.actor.image = 'flying_enemy_1'
+        self.actor.pos = (x, y) # Posição inicial
+        self.start_y = y # Posição Y inicial (para movimento ondular)
+        self.time = 0 # Tempo para movimento senoidal
+        self.speed = 100 # Velocidade de movimento
+        self.amplitude = 50 # Amplitude do movimento vertical
+        self.direction = 1 # Direção do movimento
+
+        # O clipe da animação depende da direção do movimento
+        self.actor.animation.clip = FLYER_RIGHT if self.direction > 0 else FLYER_LEFT
+        self.actor.animation.phase = phase
+        self.patrol_range = 200 # Alcance da patrulha
+        self.start_x = x # Posição X inicial
+        self.active = True # Estado do inimigo (ativo/derrotado)
+        self.level_key = None # Identificação na fase (pedaço, tipo, índice)
+
+    # Atualiza posição e animação do inimigo voado
+    def update(self, dt):
+        if not self.active:
+            return
+
+        # Atualiza posição horizontal
+        new_x = self.actor.x + self.direction * self.speed * dt
+
+        # Verifica se atingiu o limite da patrulha
+        if abs(new_x - self.start_x) > self.patrol_range:
+            self.direction *= -1
+            # Usa os frames apropriados baseado na direção
+            self.actor.animation.clip = FLYER_RIGHT if self.direction > 0 else FLYER_LEFT
+        else:
+            self.actor.x = new_x
+
+       # Atualiza posição vertical usando função seno
+        self.time += dt
+        self.actor.y = self.start_y + sin(self.time * 3) * self.amplitude
+
+
+# Classe principal que gerencia todo o jogo
+class Game:
+    def __init__(self, keep_music_state=False, keep_sound_state=False, audio=None,
+                 physics_hz=None, max_steps_per_frame=None, batched=None, level=None,
+                 offscreen_interval=None, profiler=None, seed=None):
+        self.state = 'MENU' # Estado inicial do jogo (MENU, PLAYING, GAME_OVER, WIN)
+        # Saída de áudio (no jogo é a do pgzero; sem janela, uma que não toca nada)
+        self.audio = audio if audio is not None else getattr(self, 'audio', NullAudio())
+        # Medidor de tempo das fases (no jogo é um FrameProfiler; sem janela, um que não mede)
+        self.profiler = profiler if profiler is not None else getattr(self, 'profiler', NullProfiler())
+        self.inputs = InputState() # Teclas pressionadas no frame atual
+        # Gerador aleatório da partida: com a mesma semente e as mesmas teclas a
+        # partida se repete igual (sem semente, cada partida sorteia uma)
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.random = random.Random(self.seed)
+
+        # Passo fixo da física: None usa o dt de cada frame direto em step()
+        self.physics_dt = 1 / physics_hz if physics_hz else getattr(self, 'physics_dt', None)
+        self.max_steps_per_frame = max_steps_per_frame or getattr(self, 'max_steps_per_frame', MAX_STEPS_PER_FRAME)
+        self.accumulator = 0 # Tempo acumulado ainda não simulado
+        self.alpha = 1 # Fração entre o passo anterior e o atual (para interpolar o desenho)
+        self.previous_positions = {} # Ator -> posição no passo anterior
+
+        # Modo em lote: plataformas móveis, moedas e inimigos atualizados com NumPy
+        self.batched = batched if batched is not None else getattr(self, 'batched', False)
+        self.batch = None
+        # Configura o estado do áudio
+        self.music_on = True if not keep_music_state else self.music_on
+        self.sound_effects_on = True if not keep_sound_state else self.sound_effects_on
+
+        # Inicializa os elementos do jogo
+        self.player = Player()
+
+        # Fase atual (caminho do arquivo ou fase já carregada). Só os pedaços
+        # perto do jogador viram plataformas, moedas e inimigos.
+        if isinstance(level, str):
+            level = load_level(level)
+        self.level = level or getattr(self, 'level', None) or load_level(DEFAULT_LEVEL)
+        # Os pools continuam de uma partida para outra: ao reiniciar, os objetos
+        # vivos voltam para os livres e são reaproveitados pelos pedaços novos
+        for name, factory in (('platforms', Platform), ('coins', Coin),
+                              ('enemies', Enemy), ('flying_enemies', FlyingEnemy)):
+            pool = getattr(self, name, None)
+            if pool is None:
+                setattr(self, name, EntityPool(factory))
+            else:
+                pool.release_all()
+        self.loaded_chunks = {} # Pedaço -> objetos criados a partir dele
+        self.removed = set() # Moedas coletadas e inimigos derrotados (para não voltarem)
+        self.current_chunk = None # Pedaço onde o jogador está
+
+        # Câmera que segue o jogador dentro da fase
+        self.player.max_x = self.level.width - 50
+        self.camera = Camera(WIDTH, HEIGHT, self.level.width, HEIGHT)
+        self.camera.follow(*self.player.actor.pos)
+
+        # Objetos fora da tela podem ser atualizados só a cada N passos (1 = sempre)
+        self.offscreen_interval = offscreen_interval or getattr(self, 'offscreen_interval', 1)
+        self.frame_count = 0 # Passos simulados desde o início
+        self.clock = AnimationClock() # Relógio único de todas as animações
+        self.skipped_dt = {} # Objeto fora da tela -> tempo acumulado sem atualizar
+        self.build_indexes()
+        self.stream_chunks()
+        self.build_batch()
+
+        # Inicia a música se estiver habilitada
+        if hasattr(self, 'music_on') and self.music_on:
+            try:
+                self.audio.play_music('background_music', 0.5)
+            except Exception as e:
+                print(f"Could not play background music: {e}")
+                self.music_on = False
+
+    # Monta os índices espaciais usados nas consultas de colisão
+    def build_indexes(self):
+        # Plataformas paradas entram uma vez; as móveis são atualizadas a cada frame
+        self.platform_index = SpatialHash()
+        for platform in self.platforms:
+            self.platform_index.insert(platform)
+        self.moving_platforms = [platform for platform in self.platforms if platform.moving]
+
+        self.coin_index = SpatialHash()
+        for coin in self.coins:
+            self.coin_index.insert(coin)
+
+        # Inimigos são indexados pelo retângulo do ator (voadores primeiro,
+        # na mesma ordem em que as colisões eram verificadas)
+        self.enemy_index = SpatialHash()
+        for group in (self.flying_enemies, self.enemies):
+            for enemy in group:
+                self.enemy_index.insert(enemy, enemy.actor)
+
+    # Carrega os pedaços perto do jogador e descarrega os que ficaram longe.
+    # Devolve True se algum pedaço mudou.
+    def stream_chunks(self):
+        center = int(self.player.actor.x // self.level.chunk_size)
+        if center == self.current_chunk:
+            return False
+        self.current_chunk = center
+        wanted = {index for index in range(center - LOAD_RADIUS, center + LOAD_RADIUS + 1)
+                  if index in self.level.chunk_ids}
+        return self.load_chunks(wanted)
+
+    # Deixa carregados exatamente os pedaços pedidos. Devolve True se algum mudou.
+    def load_chunks(self, wanted):
+        if wanted == self.loaded_chunks.keys():
+            return False
+
+        # No modo em lote os arrays são a fonte da verdade: copia tudo de volta
+        # para os objetos antes de mexer nas listas
+        if self.batch is not None:
+            self.batch.flush()
+        for index in set(self.loaded_chunks) - wanted:
+            self.unload_chunk(index)
+        for index in sorted(wanted - self.loaded_chunks.keys()):
+            self.load_chunk(index)
+        if self.batch is not None:
+            self.build_batch()
+        return True
+
+    # Cria os objetos de um pedaço da fase e coloca nos índices
+    def load_chunk(self, index):
+        chunk = self.level.load_chunk(index)
+        entities = []
+        for i, (image, x, y, moving, move_range, is_final) in enumerate(chunk.platforms):
+            platform = self.platforms.acquire(image, (x, y), moving=moving, move_range=move_range, is_final=is_final)
+            platform.level_key = (index, 'platform', i)
+            self.platform_index.insert(platform)
+            if moving:
+                self.moving_platforms.append(platform)
+            entities.append(platform)
+        for i, pos in enumerate(chunk.coins):
+            key = (index, 'coin', i)
+            if key not in self.removed:
+                coin = self.coins.acquire(pos)
+                coin.level_key = key
+                self.coin_index.insert(coin)
+                entities.append(coin)
+        for kind, spawns, pool, options in (
+                ('flyer', chunk.flying_enemies, self.flying_enemies, {}),
+                ('enemy', chunk.enemies, self.enemies, {'rng': self.random})):
+            for i, (x, y) in enumerate(spawns):
+                key = (index, kind, i)
+                if key not in self.removed:
+                    enemy = pool.acquire(x, y, **options)
+                    enemy.level_key = key
+                    self.enemy_index.insert(enemy, enemy.actor)
+                    entities.append(enemy)
+        self.loaded_chunks[index] = entities
+
+    # Remove dos pools e dos índices os objetos de um pedaço. Objetos já
+    # removidos (moedas coletadas, inimigos derrotados) podem ter sido
+    # reaproveitados por outro pedaço, então só saem os que ainda são deste.
+    def unload_chunk(self, index):
+        entities = [entity for entity in self.loaded_chunks.pop(index)
+                    if entity.pool_slot is not None and entity.level_key[0] == index]
+        for spatial_index in (self.platform_index, self.coin_index, self.enemy_index):
+            for entity in entities:
+                spatial_index.remove(entity)
+        for entity in entities:
+            self.release(entity)
+        if any(entity.moving for entity in entities if isinstance(entity, Platform)):
+            self.moving_platforms = [p for p in self.moving_platforms if p.pool_slot is not None]
+
+    # Devolve um objeto ao pool do seu tipo, esquecendo o estado guardado dele
+    def release(self, entity):
+        if isinstance(entity, Platform):
+            pool = self.platforms
+        elif isinstance(entity, Coin):
+            pool = self.coins
+        elif isinstance(entity, FlyingEnemy):
+            pool = self.flying_enemies
+        else:
+            pool = self.enemies
+        pool.release(entity)
+        self.skipped_dt.pop(entity, None)
+        self.previous_positions.pop(getattr(entity, 'actor', entity), None)
+
+    # Tira uma fotografia do estado da partida (para reiniciar, checkpoints ou
+    # suspender a sessão com Snapshot.to_bytes)
+    def snapshot(self):
+        return capture(self)
+
+    # Volta ao estado de uma fotografia sem recriar o jogo nem mexer no áudio
+    def restore(self, snapshot):
+        restore_snapshot(self, snapshot)
+
+    # Cria o armazenamento em lote se o modo estiver ligado e o NumPy existir
+    def build_batch(self):
+        self.batch = None
+        if self.batched:
+            from batch import EntityBatch, np
+            if np is not None:
+                self.batch = EntityBatch(self)
+
+    # Devolve as plataformas, moedas, inimigos e inimigos voadores que aparecem
+    # na câmera, consultando os índices espaciais (o resto da fase é ignorado)
+    def visible_entities(self):
+        camera = self.camera
+        platforms = [p for p in self.platform_index.query(camera, VIEW_MARGIN)
+                     if camera.is_visible(p, VIEW_MARGIN)]
+        coins = [c for c in self.coin_index.query(camera, VIEW_MARGIN)
+                 if camera.is_visible(c, VIEW_MARGIN)]
+        nearby_enemies = self.enemy_index.query(camera, VIEW_MARGIN)
+        if self.batch is not None:
+            # No modo em lote só os inimigos visíveis são copiados para os atores
+            self.batch.sync(nearby_enemies)
+        enemies = []
+        flying_enemies = []
+        for enemy in nearby_enemies:
+            if camera.is_visible(enemy.actor, VIEW_MARGIN):
+                (flying_enemies if isinstance(enemy, FlyingEnemy) else enemies).append(enemy)
+
+        # Só os atores visíveis recebem o frame atual da animação
+        time = self.clock.time
+        for coin in coins:
+            coin.animation.apply(coin, time)
+        for enemy in enemies + flying_enemies:
+            enemy.actor.animation.apply(enemy.actor, time)
+        return platforms, coins, enemies, flying_enemies
+
+    # Devolve o dt com que um objeto deve ser atualizado neste passo. Objetos
+    # longe da câmera só são atualizados a cada offscreen_interval passos, com
+    # o tempo acumulado; 0 quer dizer que o objeto fica parado neste passo. A
+    # coluna do objeto na fase espalha as atualizações entre os passos.
+    # (No modo em lote todos são atualizados juntos e isto não é usado.)
+    def entity_dt(self, entity, rect, dt):
+        if self.offscreen_interval <= 1:
+            return dt
+        skipped = self.skipped_dt.pop(entity, 0) + dt
+        if (self.camera.is_visible(rect, VIEW_MARGIN) or
+                (self.frame_count + int(rect.left // CELL_SIZE)) % self.offscreen_interval == 0):
+            return skipped
+        self.skipped_dt[entity] = skipped
+        return 0
+
+    # Métodos para controle de música
+    def toggle_music(self):
+        self.music_on = not self.music_on
+        if self.music_on:
+            try:
+                self.audio.unpause_music(0.5)
+            except:
+                self.music_on = False
+        else:
+            self.audio.pause_music()
+
+    # Métodos para controle de efeitos sonoros
+    def toggle_sound_effects(self):
+        self.sound_effects_on = not self.sound_effects_on
+
+    # Toca um efeito sonoro se os efeitos estiverem ligados
+    def play_sound(self, name):
+        if self.sound_effects_on:
+            self.audio.play(name)
+
+    # Avança a simulação um passo com as teclas informadas e devolve o novo estado
+    def step(self, dt, inputs=None):
+        if inputs is not None:
+            self.inputs = inputs
+        self.update(dt)
+        if self.state == 'PLAYING':
+            self.handle_input(dt)
+        return self.observe()
+
+    # Avança a simulação pelo tempo de um frame desenhado. No modo de passo fixo
+    # o tempo é acumulado e consumido em passos de physics_dt, e o que sobra vira
+    # a fração usada para interpolar as posições no desenho.
+    def advance(self, frame_dt, inputs=None):
+        if self.physics_dt is None:
+            return self.step(frame_dt, inputs)
+
+        self.accumulator += frame_dt
+        steps = 0
+        while self.accumulator >= self.physics_dt and steps < self.max_steps_per_frame:
+            self.save_previous_positions()
+            self.step(self.physics_dt, inputs)
+            self.accumulator -= self.physics_dt
+            steps += 1
+
+        # Se a máquina não deu conta, descarta o atraso em vez de acumular
+        if self.accumulator >= self.physics_dt:
+            self.accumulator = 0
+        self.alpha = self.accumulator / self.physics_dt
+        return self.observe()
+
+    # Atores que são desenhados com posição interpolada
+    def interpolated_actors(self):
+        actors = [self.player.actor]
+        actors.extend(self.moving_platforms)
+        if self.batch is not None:
+            # No modo em lote os atores dos inimigos só são atualizados para desenhar
+            return actors
+        actors.extend(enemy.actor for enemy in self.flying_enemies)
+        actors.extend(enemy.actor for enemy in self.enemies)
+        return actors
+
+    # Guarda a posição dos atores antes de um passo de física
+    def save_previous_positions(self):
+        self.previous_positions = {actor: (actor.x, actor.y) for actor in self.interpolated_actors()}
+
+    # Devolve a posição de desenho de um ator, interpolada entre os dois últimos passos
+    def render_pos(self, actor):
+        previous = self.previous_positions.get(actor)
+        if previous is None or self.physics_dt is None:
+            return actor.x, actor.y
+        return (previous[0] + (actor.x - previous[0]) * self.alpha,
+                previous[1] + (actor.y - previous[1]) * self.alpha)
+
+    # Devolve o estado observável do jogo
+    def observe(self):
+        return Observation(self.player.actor.x, self.player.actor.y, self.player.velocity_y,
+                           self.player.health, self.player.score, self.state)
+
+    # Aplica o movimento horizontal e o pulo a partir das teclas pressionadas
+    # (por padrão as do jogador do jogo; no multijogador, as de cada jogador)
+    def handle_input(self, dt, player=None, inputs=None):
+        player = player if player is not None else self.player
+        inputs = inputs if inputs is not None else self.inputs
+        if inputs.left:
+            player.actor.x -= player.speed * dt
+            player.facing_right = False
+        if inputs.right:
+            player.actor.x += player.speed * dt
+            player.facing_right = True
+        if inputs.space and not player.jumping and player.on_ground:
+            player.velocity_y = player.jump_strength
+            player.jumping = True
+            self.play_sound('jump')
+
+    # Atualiza todos os elementos do jogo
+    def update(self, dt):
+        if self.state == 'PLAYING':
+            self.profiler.start()
+            self.frame_count += 1
+            self.clock.advance(dt)
+            self.stream_chunks()
+            self.player.update(dt, self.platform_index, self.inputs, self.clock.time)
+            self.camera.follow(*self.player.actor.pos)
+            self.profiler.mark('physics')
+
+            self.update_entities(dt)
+            self.profiler.mark('entities')
+            outcome = self.check_collisions(self.player)
+            if outcome == 'GAME_OVER':
+                self.state = 'GAME_OVER'
+                self.audio.stop_music()
+                self.play_sound('game_over')
+            elif outcome == 'WIN':
+                self.state = 'WIN'
+                self.audio.stop_music()
+                self.play_sound('victory')  # You'll need to add a victory sound
+            self.profiler.mark('collisions')
+
+    # Atualiza as plataformas móveis e os inimigos
+    def update_entities(self, dt):
+        if self.batch is not None:
+            # Plataformas móveis e inimigos atualizados de uma vez
+            self.batch.update(dt)
+        else:
+            # Atualiza as plataformas móveis e a posição delas no índice
+            for platform in self.moving_platforms:
+                platform_dt = self.entity_dt(platform, platform, dt)
+                if platform_dt:
+                    platform.update(platform_dt)
+                    self.platform_index.move(platform)
+
+            # Atualiza inimigos voadores e terrestres
+            # (os pools só têm os vivos: derrotados já saíram)
+            for flying_enemy in self.flying_enemies:
+                enemy_dt = self.entity_dt(flying_enemy, flying_enemy.actor, dt)
+                if enemy_dt:
+                    flying_enemy.update(enemy_dt)
+                    self.enemy_index.move(flying_enemy)
+            for enemy in self.enemies:
+                enemy_dt = self.entity_dt(enemy, enemy.actor, dt)
+                if enemy_dt:
+                    enemy.update(enemy_dt, self.platforms)
+                    self.enemy_index.move(enemy)
+
+    # Verifica as moedas, os inimigos e a plataforma final perto de um jogador.
+    # Devolve o resultado para esse jogador: 'GAME_OVER' se a vida acabou,
+    # 'WIN' se ele chegou na plataforma final ou None se continua jogando.
+    def check_collisions(self, player):
+        time = self.clock.time
+        outcome = None
+
+        # Verifica coleta das moedas perto do jogador (com o frame atual de cada uma)
+        for coin in self.coin_index.query(player.actor, ANIMATION_MARGIN):
+            coin.animation.apply(coin, time)
+            if player.actor.colliderect(coin) and contact(player.actor, coin):
+                self.coin_index.remove(coin)
+                self.removed.add(coin.level_key)
+                self.release(coin)
+                player.score += 10
+                self.play_sound('coin')
+
+        # Verifica colisões com os inimigos perto do jogador
+        nearby_enemies = self.enemy_index.query(player.actor, ANIMATION_MARGIN)
+        if self.batch is not None:
+            self.batch.sync(nearby_enemies)
+        for enemy in nearby_enemies:
+            enemy.actor.animation.apply(enemy.actor, time)
+            if player.actor.colliderect(enemy.actor):
+                normal = contact(player.actor, enemy.actor)
+                if normal is None:
+                    continue # Só as partes transparentes dos frames se encostaram
+                # A normal aponta do jogador para o inimigo: caindo e com o
+                # inimigo saindo por baixo, o jogador pulou em cima
+                if player.velocity_y > 0 and normal == (0, 1):
+                    # Jogador pulou em cima do inimigo
+                    enemy.active = False
+                    self.enemy_index.remove(enemy)
+                    self.removed.add(enemy.level_key)
+                    if self.batch is not None:
+                        self.batch.deactivate(enemy)
+                    self.release(enemy)
+                    player.velocity_y = -300
+                    self.play_sound('hurt')
+                else:
+                    # Jogador colidiu com o inimigo
+                    player.health -= 1
+                    self.play_sound('hurt')
+                    if player.health <= 0:
+                        outcome = 'GAME_OVER'
+
+        # Verifica condição de vitória nas plataformas perto do jogador
+        for platform in self.platform_index.query(player.actor):
+            if platform.is_final and player.actor.colliderect(platform):
+                if player.actor.bottom <= platform.top + 10:  # Make sure player is on top
+                    outcome = 'WIN'
+        return outcome
@@ -0,0 +1,297 @@
+import random
+import struct
+import zlib
+
+import atlas
+from animation import CLIPS
+from spatial import SpatialHash
+
+# Fotografia (snapshot) do estado da simulação. Em vez de recriar tudo com
+# Game.__init__, o jogo guarda o estado uma vez e depois o restaura no mesmo
+# objeto: os pedaços da fase são recarregados pelos pools (reaproveitando os
+# objetos) e só o que muda durante a partida é sobrescrito. O áudio não é
+# tocado. Serve para reiniciar a partida, para pontos de controle
+# (checkpoints) no meio da fase e, gravado em bytes, para suspender e
+# continuar uma sessão. A fotografia vale para a fase em que foi tirada.
+#
+# Formato (little-endian): 'KSNP' + versão (H) + dados comprimidos com zlib:
+#   jogo        estado, semente, passos, relógio, acumulador, pedaço atual,
+#               teclas, câmera, estado do gerador aleatório
+#   jogador     posição, velocidade, flags, vida, pontos, imagem e clipe
+#   pedaços     carregados e objetos removidos (moedas coletadas, inimigos derrotados)
+#   objetos     plataformas móveis (x, direção), inimigos (x, y, direção),
+#               voadores (x, y, tempo, direção)
+#   índices     ordem dos objetos em cada índice espacial (decide a ordem das colisões)
+#   throttle    tempo acumulado dos objetos fora da tela
+#
+# Os objetos são identificados pela chave da fase (pedaço, tipo, índice).
+# Bytes que não são uma fotografia (arquivo cortado ou vazio) e fotografias
+# de outra fase dão ValueError, antes de o jogo ser alterado.
+
+MAGIC = b'KSNP'
+VERSION = 1
+HEADER = struct.Struct('<4sH')
+
+STATES = ('MENU', 'PLAYING', 'GAME_OVER', 'WIN')
+KINDS = ('platform', 'coin', 'enemy', 'flyer')
+NO_CHUNK = -2 ** 31 # Pedaço atual ainda não definido
+
+GAME = struct.Struct('<BQIddiBdd')
+RNG = struct.Struct('<i625IBd')
+PLAYER = struct.Struct('<dddBBBii')
+KEY = struct.Struct('<iBI')
+COUNT = struct.Struct('<I')
+CHUNK = struct.Struct('<i')
+PLATFORM = struct.Struct('<db')
+ENEMY = struct.Struct('<ddb')
+FLYER = struct.Struct('<dddb')
+SKIPPED = struct.Struct('<d')
+
+
+# Classe que guarda o estado da simulação (só dados, sem atores)
+class Snapshot:
+    def __init__(self):
+        self.game = None # Tupla no formato GAME
+        self.rng = None # Estado do random.Random
+        self.player = None # Tupla no formato PLAYER
+        self.player_image = None
+        self.player_clip = None
+        self.loaded_chunks = []
+        self.removed = []
+        self.platforms = [] # (chave, x, direção)
+        self.enemies = [] # (chave, x, y, direção)
+        self.flyers = [] # (chave, x, y, tempo, direção)
+        self.index_orders = ([], [], []) # Plataformas, moedas, inimigos
+        self.skipped = [] # (chave, dt acumulado)
+
+    # Transforma a fotografia em bytes
+    def to_bytes(self):
+        parts = [GAME.pack(*self.game)]
+        version, state, gauss = self.rng
+        parts.append(RNG.pack(version, *state, gauss is not None, gauss or 0.0))
+        parts.append(PLAYER.pack(*self.player))
+        for name in (self.player_image, self.player_clip):
+            encoded = name.encode('utf-8')
+            parts.append(bytes([len(encoded)]) + encoded)
+        parts.append(COUNT.pack(len(self.loaded_chunks)))
+        parts.extend(CHUNK.pack(index) for index in self.loaded_chunks)
+        for keys in (self.removed,) + self.index_orders:
+            parts.append(COUNT.pack(len(keys)))
+            parts.extend(pack_key(key) for key in keys)
+        for records, record in ((self.platforms, PLATFORM), (self.enemies, ENEMY),
+                                (self.flyers, FLYER), (self.skipped, SKIPPED)):
+            parts.append(COUNT.pack(len(records)))
+            parts.extend(pack_key(key) + record.pack(*values) for key, *values in records)
+        return HEADER.pack(MAGIC, VERSION) + zlib.compress(b''.join(parts))
+
+    # Lê uma fotografia gravada com to_bytes (qualquer falha vira ValueError)
+    @classmethod
+    def from_bytes(cls, data):
+        try:
+            return cls.decode(data)
+        except (struct.error, zlib.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"corrupt snapshot: {e}") from e
+
+    @classmethod
+    def decode(cls, data):
+        magic, version = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a snapshot (version {VERSION})")
+        reader = Reader(zlib.decompress(data[HEADER.size:]))
+        snapshot = cls()
+        snapshot.game = reader.read(GAME)
+        rng = reader.read(RNG)
+        snapshot.rng = (rng[0], tuple(rng[1:626]), rng[627] if rng[626] else None)
+        snapshot.player = reader.read(PLAYER)
+        snapshot.player_image = reader.read_name()
+        snapshot.player_clip = reader.read_name()
+        snapshot.loaded_chunks = [reader.read(CHUNK)[0] for _ in range(reader.read(COUNT)[0])]
+        snapshot.removed = reader.read_keys()
+        snapshot.index_orders = (reader.read_keys(), reader.read_keys(), reader.read_keys())
+        for name, record in (('platforms', PLATFORM), ('enemies', ENEMY),
+                             ('flyers', FLYER), ('skipped', SKIPPED)):
+            records = []
+            for _ in range(reader.read(COUNT)[0]):
+                key = reader.read_key()
+                records.append((key,) + reader.read(record))
+            setattr(snapshot, name, records)
+        return snapshot
+
+
+# Função que transforma uma chave da fase (pedaço, tipo, índice) em bytes
+def pack_key(key):
+    return KEY.pack(key[0], KINDS.index(key[1]), key[2])
+
+
+# Classe que lê os campos em sequência
+class Reader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, record):
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values
+
+    def read_name(self):
+        size = self.data[self.offset]
+        name = self.data[self.offset + 1:self.offset + 1 + size].decode('utf-8')
+        self.offset += 1 + size
+        return name
+
+    def read_key(self):
+        chunk, kind, i = self.read(KEY)
+        return (chunk, KINDS[kind], i)
+
+    def read_keys(self):
+        return [self.read_key() for _ in range(self.read(COUNT)[0])]
+
+
+# Função que devolve as chaves dos objetos de um índice, na ordem de inserção
+def index_order(spatial_index):
+    entries = spatial_index.entries
+    return [item.level_key for item in sorted(entries, key=lambda item: entries[item][2])]
+
+
+# Função que tira a fotografia do estado atual do jogo
+def capture(game):
+    if game.batch is not None:
+        game.batch.flush() # No modo em lote os arrays são a fonte da verdade
+
+    snapshot = Snapshot()
+    player = game.player
+    inputs = game.inputs
+    current_chunk = game.current_chunk if game.current_chunk is not None else NO_CHUNK
+    snapshot.game = (STATES.index(game.state), game.seed, game.frame_count, game.clock.time,
+                     game.accumulator, current_chunk,
+                     (1 if inputs.left else 0) | (2 if inputs.right else 0) | (4 if inputs.space else 0),
+                     game.camera.left, game.camera.top)
+    snapshot.rng = game.random.getstate()
+    snapshot.player = (player.actor.x, player.actor.y, player.velocity_y, player.jumping,
+                       player.facing_right, player.on_ground, player.health, player.score)
+    snapshot.player_image = player.actor.image
+    snapshot.player_clip = player.animation.clip.name
+    snapshot.loaded_chunks = sorted(game.loaded_chunks)
+    snapshot.removed = sorted(game.removed)
+    snapshot.platforms = [(p.level_key, p.x, p.direction) for p in game.moving_platforms]
+    snapshot.enemies = [(e.level_key, e.actor.x, e.actor.y, e.direction) for e in game.enemies]
+    snapshot.flyers = [(f.level_key, f.actor.x, f.actor.y, f.time, f.direction) for f in game.flying_enemies]
+    snapshot.index_orders = (index_order(game.platform_index), index_order(game.coin_index),
+                             index_order(game.enemy_index))
+    snapshot.skipped = [(entity.level_key, dt) for entity, dt in game.skipped_dt.items()]
+    return snapshot
+
+
+# Função que confere, sem mexer no jogo, se a fotografia pode ser restaurada:
+# os valores fazem sentido, os pedaços existem na fase carregada e os objetos
+# guardados são exatamente os que vão existir depois de carregar esses
+# pedaços (sem os removidos)
+def check(game, snapshot):
+    try:
+        random.Random().setstate(snapshot.rng)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"corrupt snapshot: {e}") from e
+    if (not 0 <= snapshot.game[0] < len(STATES) or snapshot.player_clip not in CLIPS
+            or atlas.frame_index(snapshot.player_image) is None):
+        raise ValueError("corrupt snapshot")
+
+    removed = set(snapshot.removed)
+    keys = {kind: set() for kind in KINDS}
+    moving = set()
+    for index in snapshot.loaded_chunks:
+        if index not in game.level.chunk_ids:
+            raise ValueError(f"snapshot is from another level (no chunk {index})")
+        chunk = game.level.load_chunk(index)
+        for i, platform in enumerate(chunk.platforms):
+            keys['platform'].add((index, 'platform', i))
+            if platform[3]:
+                moving.add((index, 'platform', i))
+        for kind, spawns in (('coin', chunk.coins), ('enemy', chunk.enemies), ('flyer', chunk.flying_enemies)):
+            keys[kind].update(key for key in ((index, kind, i) for i in range(len(spawns))) if key not in removed)
+    enemies = keys['enemy'] | keys['flyer']
+    for saved, expected in (({record[0] for record in snapshot.platforms}, moving),
+                            ({record[0] for record in snapshot.enemies}, keys['enemy']),
+                            ({record[0] for record in snapshot.flyers}, keys['flyer']),
+                            (set(snapshot.index_orders[0]), keys['platform']),
+                            (set(snapshot.index_orders[1]), keys['coin']),
+                            (set(snapshot.index_orders[2]), enemies)):
+        if saved != expected:
+            raise ValueError("snapshot is from another level (objects do not match)")
+    if not {key for key, dt in snapshot.skipped} <= moving | enemies:
+        raise ValueError("snapshot is from another level (objects do not match)")
+
+
+# Função que restaura o jogo no estado da fotografia, no mesmo objeto
+def restore(game, snapshot):
+    from simulation import InputState, FLYER_LEFT, FLYER_RIGHT
+
+    # Tudo é conferido antes: uma fotografia que não serve não deixa o jogo pela metade
+    check(game, snapshot)
+
+    # Todos os objetos voltam para os pools e os pedaços da fotografia são
+    # carregados de novo (os objetos removidos não voltam)
+    game.batch = None
+    for pool in (game.platforms, game.coins, game.enemies, game.flying_enemies):
+        pool.release_all()
+    game.loaded_chunks = {}
+    game.removed = set(snapshot.removed)
+    game.previous_positions = {}
+    game.build_indexes()
+    for index in snapshot.loaded_chunks:
+        game.load_chunk(index)
+    entities = {entity.level_key: entity
+                for chunk in game.loaded_chunks.values() for entity in chunk}
+
+    # Estado dos objetos que se movem
+    for key, x, direction in snapshot.platforms:
+        platform = entities[key]
+        platform.x = x
+        platform.direction = direction
+    for key, x, y, direction in snapshot.enemies:
+        enemy = entities[key]
+        enemy.actor.pos = (x, y)
+        enemy.direction = direction
+        enemy.actor.flip_x = (direction < 0)
+    for key, x, y, time, direction in snapshot.flyers:
+        flyer = entities[key]
+        flyer.actor.pos = (x, y)
+        flyer.time = time
+        flyer.direction = direction
+        flyer.actor.animation.clip = FLYER_RIGHT if direction > 0 else FLYER_LEFT
+    game.skipped_dt = {entities[key]: dt for key, dt in snapshot.skipped}
+
+    # Índices com a mesma ordem de antes (a ordem decide qual colisão vem
+    # primeiro). Normalmente a ordem de carga já é a mesma e nada é refeito;
+    # os objetos que se moveram só trocam de célula.
+    for name, order, actor in (('platform_index', snapshot.index_orders[0], False),
+                               ('coin_index', snapshot.index_orders[1], False),
+                               ('enemy_index', snapshot.index_orders[2], True)):
+        spatial_index = getattr(game, name)
+        if index_order(spatial_index) == order:
+            for key in order:
+                spatial_index.move(entities[key])
+            continue
+        spatial_index = SpatialHash(spatial_index.cell_size)
+        for key in order:
+            entity = entities[key]
+            spatial_index.insert(entity, entity.actor if actor else entity)
+        setattr(game, name, spatial_index)
+
+    # Jogador
+    player = game.player
+    (player.actor.x, player.actor.y, player.velocity_y, jumping, facing_right, on_ground,
+     player.health, player.score) = snapshot.player
+    player.jumping, player.facing_right, player.on_ground = bool(jumping), bool(facing_right), bool(on_ground)
+    player.actor.image = snapshot.player_image
+    player.animation.clip = CLIPS[snapshot.player_clip]
+
+    # Jogo
+    (state, game.seed, game.frame_count, game.clock.time, game.accumulator, current_chunk,
+     inputs, game.camera.left, game.camera.top) = snapshot.game
+    game.state = STATES[state]
+    game.current_chunk = current_chunk if current_chunk != NO_CHUNK else None
+    game.inputs = InputState(bool(inputs & 1), bool(inputs & 2), bool(inputs & 4))
+    game.alpha = game.accumulator / game.physics_dt if game.physics_dt else 1
+    game.random.setstate(snapshot.rng)
+    game.build_batch()
@@ -0,0 +1,91 @@
+# Grade espacial (spatial hash) usada como fase ampla das colisões: cada
+# objeto é guardado nas células da grade que o seu retângulo ocupa, e uma
+# consulta só olha as células perto da área pedida. Assim o custo de uma
+# consulta depende de quantos objetos estão por perto, e não do total da fase.
+
+CELL_SIZE = 128 # Tamanho padrão das células em pixels
+
+
+# Classe que indexa objetos pelo retângulo em uma grade uniforme
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size # Tamanho de cada célula em pixels
+        self.cells = {} # (coluna, linha) -> conjunto de objetos na célula
+        self.entries = {} # objeto -> [retângulo, faixa de células, ordem de inserção]
+        self.counter = 0 # Contador para manter a ordem de inserção nas consultas
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    # Calcula a faixa de células (col0, lin0, col1, lin1) ocupada por um retângulo,
+    # aumentado pela margem em todos os lados
+    def cell_range(self, rect, margin=0):
+        size = self.cell_size
+        left = rect.left - margin
+        top = rect.top - margin
+        return (int(left // size), int(top // size),
+                int((left + rect.width + 2 * margin) // size), int((top + rect.height + 2 * margin) // size))
+
+    # Adiciona o objeto nas células da faixa
+    def _add_to_cells(self, item, cells_range):
+        x0, y0, x1, y1 = cells_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = self.cells[(cx, cy)] = set()
+                cell.add(item)
+
+    # Remove o objeto das células da faixa
+    def _remove_from_cells(self, item, cells_range):
+        x0, y0, x1, y1 = cells_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(item)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    # Insere um objeto; rect é qualquer coisa com left, top, width e height
+    # (por padrão o próprio objeto)
+    def insert(self, item, rect=None):
+        if rect is None:
+            rect = item
+        cells_range = self.cell_range(rect)
+        self.entries[item] = [rect, cells_range, self.counter]
+        self.counter += 1
+        self._add_to_cells(item, cells_range)
+
+    # Remove um objeto do índice (se ele estiver lá)
+    def remove(self, item):
+        entry = self.entries.pop(item, None)
+        if entry is not None:
+            self._remove_from_cells(item, entry[1])
+
+    # Atualiza um objeto que se moveu; só mexe na grade se ele mudou de célula
+    def move(self, item):
+        entry = self.entries[item]
+        cells_range = self.cell_range(entry[0])
+        if cells_range != entry[1]:
+            self._remove_from_cells(item, entry[1])
+            self._add_to_cells(item, cells_range)
+            entry[1] = cells_range
+
+    # Devolve os objetos das células que o retângulo ocupa, na ordem de inserção.
+    # São só candidatos: quem chama ainda precisa testar a colisão de verdade.
+    def query(self, rect, margin=0):
+        x0, y0, x1, y1 = self.cell_range(rect, margin)
+        cells = self.cells
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        if len(found) > 1:
+            entries = self.entries
+            return sorted(found, key=lambda item: entries[item][2])
+        return list(found)
@@ -0,0 +1,255 @@
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # Não existe no Windows (o pico de memória fica de fora)
+    resource = None
+
+from profiler import percentile
+
+# Teste de carga do update() e do draw() do jogo. Gera fases sintéticas com
+# N plataformas paradas, N móveis, N moedas, N inimigos e N voadores (todos
+# carregados ao mesmo tempo) e roda o jogo de verdade (o game.py, com o
+# pgzero) sem janela e sem som, com o jogador correndo e pulando. Cada
+# tamanho roda em um processo separado, para o pico de memória de um não
+# contaminar o do outro.
+#
+# Medidas de cada tamanho:
+#   tempo por quadro     percentis de update(), draw() e do quadro inteiro (ms)
+#   alocações            memória temporária alocada por quadro (pico acima do
+#                        início do quadro), blocos que ficam vivos por quadro
+#                        e coletas do coletor de lixo
+#   memória              pico do Python ao montar a fase e o jogo, pico do
+#                        Python durante os quadros e pico do processo
+#
+# Uso:
+#   python stress.py                         roda 10, 100, 1000 e 10000 e grava stress.json
+#   python stress.py base.json 10 100        tamanhos escolhidos, outro arquivo
+#   python stress.py compare antes.json depois.json
+#   python stress.py lote.json --batched     o mesmo com o modo em lote (batch.py, precisa do NumPy)
+
+SIZES = (10, 100, 1000, 10000)
+DEFAULT_OUTPUT = 'stress.json'
+GAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game.py')
+
+STRESS_WIDTH = 2400 # Largura da fase (3 telas), em um único pedaço: tudo fica carregado
+FRAME_DT = 1 / 60 # Tempo de cada quadro simulado
+WARMUP_FRAMES = 30 # Quadros descartados antes de medir
+ALLOCATION_FRAMES = 60 # Quadros medidos com o tracemalloc ligado (ele deixa tudo mais lento)
+RUN_TIME = 3 # Segundos correndo para cada lado
+JUMP_INTERVAL = 40 # Quadros entre um pulo e outro
+
+
+# Função que decide quantos quadros medir (menos quadros nas fases enormes)
+def frames_for(count):
+    return max(60, min(600, 600000 // count))
+
+
+# Função que gera a fase sintética com count objetos de cada tipo
+def stress_level(count, seed=0):
+    from levels import JsonLevel
+    from simulation import HEIGHT
+    rng = random.Random(seed)
+
+    def point():
+        return [rng.uniform(50, STRESS_WIDTH - 50), rng.uniform(-300, HEIGHT - 60)]
+
+    platforms = [{'image': 'platform', 'pos': point()} for _ in range(count)]
+    platforms += [{'image': 'platform_moving', 'pos': point(), 'moving': True,
+                   'move_range': rng.uniform(50, 150)} for _ in range(count)]
+    return JsonLevel({
+        'chunk_size': STRESS_WIDTH,
+        'platforms': platforms,
+        'coins': [point() for _ in range(count)],
+        'enemies': [point() for _ in range(count)],
+        'flying_enemies': [point() for _ in range(count)],
+    })
+
+
+# Função que abre o game.py como o pgzrun faria, mas sem entrar no laço do pgzero
+def load_game():
+    from types import ModuleType
+    sys._pgzrun = True # O pgzrun.go() do fim do game.py não abre o laço
+    import pgzero.runner
+    import pgzero.game
+    mod = ModuleType('game')
+    mod.__file__ = GAME_SCRIPT
+    sys.modules['game'] = mod
+    pgzero.runner.prepare_mod(mod)
+    with open(GAME_SCRIPT, encoding='utf-8') as f:
+        exec(compile(f.read(), GAME_SCRIPT, 'exec', dont_inherit=True), mod.__dict__)
+    pgzero.game.PGZeroGame(mod).reinit_screen()
+    mod.loader.wait()
+    mod.update(0) # Cria o jogo com os arquivos carregados
+    return mod
+
+
+# Função que aperta as teclas do quadro: corre para um lado e para o outro, pulando
+def press_keys(keyboard, frame):
+    import pygame
+    right = (frame * FRAME_DT) % (2 * RUN_TIME) < RUN_TIME
+    for key, down in ((pygame.K_RIGHT, right), (pygame.K_LEFT, not right),
+                      (pygame.K_SPACE, frame % JUMP_INTERVAL == 0)):
+        if down:
+            keyboard._press(key)
+        else:
+            keyboard._release(key)
+
+
+# Função que roda um tamanho neste processo e devolve as medidas
+def run(count, frames=None, batched=False):
+    import pygame
+    from simulation import Game, PHYSICS_HZ
+    frames = frames or frames_for(count)
+
+    mod = load_game()
+    # Memória usada para montar a fase e o jogo
+    tracemalloc.start()
+    mod.game = Game(audio=mod.game.audio, physics_hz=PHYSICS_HZ, level=stress_level(count), batched=batched)
+    setup_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    mod.game.player.health = 10 ** 9 # O jogador não morre durante o teste
+    mod.game.state = 'PLAYING'
+    entities = (len(mod.game.platforms) + len(mod.game.coins) + len(mod.game.enemies)
+                + len(mod.game.flying_enemies))
+
+    # Um quadro completo, do jeito que o pgzero faz: update, draw e envio para a janela
+    def frame(i):
+        press_keys(mod.keyboard, i)
+        start = time.perf_counter()
+        mod.update(FRAME_DT)
+        middle = time.perf_counter()
+        mod.draw()
+        pygame.display.flip()
+        return middle - start, time.perf_counter() - middle
+
+    for i in range(WARMUP_FRAMES):
+        frame(i)
+
+    # Tempo por quadro
+    times = {'update': [], 'draw': [], 'frame': []}
+    collections = [stats['collections'] for stats in gc.get_stats()]
+    for i in range(WARMUP_FRAMES, WARMUP_FRAMES + frames):
+        update_time, draw_time = frame(i)
+        times['update'].append(update_time)
+        times['draw'].append(draw_time)
+        times['frame'].append(update_time + draw_time)
+    collections = [stats['collections'] - before for stats, before in zip(gc.get_stats(), collections)]
+
+    # Alocações (em quadros separados, porque o tracemalloc deixa o jogo mais lento)
+    allocated = []
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    start_index = WARMUP_FRAMES + frames
+    for i in range(start_index, start_index + ALLOCATION_FRAMES):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        frame(i)
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+    frame_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks
+
+    # batched diz se o modo em lote foi pedido; sem o NumPy o jogo usa o update de cada objeto
+    result = {'count': count, 'entities': entities, 'frames': frames,
+              'batched': mod.game.batch is not None}
+    for name, values in times.items():
+        values = sorted(values)
+        result[name] = {
+            'mean': sum(values) / len(values) * 1000,
+            'p50': percentile(values, 50) * 1000,
+            'p95': percentile(values, 95) * 1000,
+            'p99': percentile(values, 99) * 1000,
+            'max': values[-1] * 1000,
+        }
+    result['allocations'] = {
+        'kb_per_frame': sum(allocated) / len(allocated) / 1024,
+        'blocks_kept_per_frame': blocks / ALLOCATION_FRAMES,
+        'gc_collections_per_100_frames': [n * 100 / frames for n in collections],
+    }
+    result['memory'] = {
+        'setup_peak_kb': setup_peak / 1024,
+        'frames_peak_kb': frame_peak / 1024,
+        'process_peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+    return result
+
+
+# Função que roda cada tamanho em um processo novo (sem janela e sem som)
+def benchmark(sizes=SIZES, batched=False):
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    results = []
+    for count in sizes:
+        command = [sys.executable, os.path.abspath(__file__), 'run', str(count)] + (['--batched'] if batched else [])
+        with tempfile.TemporaryDirectory() as workdir: # O que o processo medido gravar fica fora do projeto
+            output = subprocess.run(command, env=env, cwd=workdir, stdout=subprocess.PIPE,
+                                    text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+        report(results[-1])
+    import pygame
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+    }
+
+
+# Função que mostra as medidas de um tamanho
+def report(result):
+    frame = result['frame']
+    print(f"{result['count']:>6} of each ({result['entities']} entities, {result['frames']} frames"
+          f"{', batched' if result.get('batched') else ''}): "
+          f"frame p50 {frame['p50']:.2f} p95 {frame['p95']:.2f} p99 {frame['p99']:.2f} ms | "
+          f"update p50 {result['update']['p50']:.2f} draw p50 {result['draw']['p50']:.2f} ms | "
+          f"alloc {result['allocations']['kb_per_frame']:.0f} KB/frame | "
+          f"setup {result['memory']['setup_peak_kb'] / 1024:.1f} MB")
+
+
+# Função que mostra, tamanho por tamanho, a diferença entre dois resultados gravados
+def compare(before_path, after_path):
+    with open(before_path, encoding='utf-8') as f:
+        before = {r['count']: r for r in json.load(f)['results']}
+    with open(after_path, encoding='utf-8') as f:
+        after = {r['count']: r for r in json.load(f)['results']}
+    print(f"{'count':>6} {'metric':<8}{'p50 before':>12}{'p50 after':>12}{'p95 before':>12}{'p95 after':>12}{'change':>9}")
+    for count in before:
+        if count not in after:
+            continue
+        for name in ('update', 'draw', 'frame'):
+            old, new = before[count][name], after[count][name]
+            change = (new['p50'] / old['p50'] - 1) * 100 if old['p50'] else 0.0
+            print(f"{count:>6} {name:<8}{old['p50']:>12.3f}{new['p50']:>12.3f}"
+                  f"{old['p95']:>12.3f}{new['p95']:>12.3f}{change:>8.1f}%")
+        old, new = before[count]['allocations'], after[count]['allocations']
+        print(f"{count:>6} {'alloc':<8}{old['kb_per_frame']:>12.1f}{new['kb_per_frame']:>12.1f} KB/frame")
+
+
+if __name__ == '__main__':
+    batched = '--batched' in sys.argv
+    args = [arg for arg in sys.argv if arg != '--batched']
+    if len(args) > 1 and args[1] == 'run':
+        # Processo filho: um tamanho, resultado em JSON na última linha
+        print(json.dumps(run(int(args[2]), batched=batched)))
+    elif len(args) > 1 and args[1] == 'compare':
+        if len(args) != 4:
+            print("Usage: python stress.py compare <before.json> <after.json>")
+            sys.exit(1)
+        compare(args[2], args[3])
+    else:
+        output = args[1] if len(args) > 1 else DEFAULT_OUTPUT
+        sizes = [int(n) for n in args[2:]] or SIZES
+        data = benchmark(sizes, batched)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        print(f"Results saved to {output}")
@@ -0,0 +1,85 @@
+import random
+import socket
+
+from netcode import encode_delta, decode_delta, PLAYER, ENEMY, COIN
+from network import Client, SNAPSHOT, SNAPSHOT_HEADER, NO_BASE
+
+# Testes da codificação das fotografias (netcode.py) e da recepção no
+# cliente (network.py). Rodar com:
+#   python -m pytest -q
+
+
+# Diferença com objetos que aparecem, somem, mudam só alguns campos e andam para trás
+def test_delta_round_trip():
+    baseline = {
+        1: (PLAYER, 400, 2000, 3, 3, 10),
+        5: (ENEMY, 8000, 1800, 12, 0, 0),
+        9: (COIN, 1200, 600, 20, 0, 0),
+        300: (ENEMY, 90000, 1800, 12, 0, 0),
+    }
+    state = {
+        1: (PLAYER, 396, 1990, 4, 2, 20), # Todos os campos mudam, x e y diminuem
+        5: (ENEMY, 7990, 1800, 12, 0, 0), # Só x muda (diferença negativa)
+        # 9 sumiu (moeda pega)
+        300: (COIN, 90000, 1800, 12, 0, 0), # Mesmo id com outro tipo: vai inteiro
+        1000000: (ENEMY, -40, -8, 1, 0, 0), # Novo, com valores negativos
+    }
+    data = encode_delta(state, baseline)
+    assert decode_delta(data, baseline) == state
+    # Sem mudança nenhuma a diferença é só o número de registros
+    assert encode_delta(state, state) == b'\x00'
+    assert decode_delta(encode_delta(state, state), state) == state
+
+
+# Diferenças aleatórias, inclusive contra a base vazia (fotografia completa)
+def test_delta_round_trip_random():
+    rng = random.Random(1)
+    for _ in range(500):
+        baseline = {rng.randrange(1, 2000): tuple(rng.randint(-70000, 70000) for _ in range(6))
+                    for _ in range(rng.randrange(20))}
+        state = {}
+        for entity_id, values in baseline.items():
+            if rng.random() < 0.8:
+                state[entity_id] = tuple(v + rng.choice((0, 0, rng.randint(-300, 300))) for v in values)
+        for _ in range(rng.randrange(5)):
+            state[rng.randrange(1, 2000)] = tuple(rng.randint(-70000, 70000) for _ in range(6))
+        assert decode_delta(encode_delta(state, baseline), baseline) == state
+        assert decode_delta(encode_delta(state, {}), {}) == state
+
+
+# Manda ao cliente uma fotografia como o servidor faria
+def send_snapshot(server, client, sequence, base, tick, state, baseline):
+    packet = SNAPSHOT_HEADER.pack(SNAPSHOT, sequence, base, tick) + encode_delta(state, baseline)
+    server.sendto(packet, client.socket.getsockname())
+
+
+# O cliente perde a fotografia que o servidor usou de base: a seguinte é
+# descartada e a confirmação continua na última base boa, até o servidor
+# mandar outra diferença a partir dela
+def test_client_lost_baseline():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    client = Client(server.getsockname())
+    try:
+        first = {1: (PLAYER, 400, 2000, 1, 3, 0), 7: (ENEMY, 800, 2000, 5, 0, 0)}
+        second = {1: (PLAYER, 440, 2000, 2, 3, 0), 7: (ENEMY, 790, 2000, 5, 0, 0)}
+        third = {1: (PLAYER, 480, 1980, 2, 3, 10)}
+        server.sendto(b'', client.socket.getsockname()) # Datagrama vazio é ignorado
+        send_snapshot(server, client, 1, NO_BASE, 10, first, {})
+        client.receive()
+        assert client.ack == 1 and client.snapshots[1] == first
+
+        # A fotografia 2 (base 1) se perde; a 3 vem com base 2
+        send_snapshot(server, client, 3, 2, 12, third, second)
+        client.receive()
+        assert client.lost == 1
+        assert client.ack == 1 and 3 not in client.snapshots
+
+        # O servidor ainda não viu a confirmação da 2 e manda a 4 com base 1
+        send_snapshot(server, client, 4, 1, 13, third, first)
+        client.receive()
+        assert client.ack == 4 and client.snapshots[4] == third
+        assert [tick for tick, state in client.timeline] == [10, 13]
+    finally:
+        client.close()
+        server.close()
@@ -0,0 +1,67 @@
+import pytest
+
+from levels import JsonLevel
+from simulation import Game, InputState, PHYSICS_HZ
+from snapshot import Snapshot
+
+# Testes das fotografias (snapshot.py): ida e volta pelos bytes e
+# checkpoints que não servem (cortados, vazios ou de outra fase). Rodar com:
+#   python -m pytest -q
+
+
+# Joga alguns quadros correndo e pulando e devolve as observações
+def play(game, frames, start=0):
+    trace = []
+    for i in range(start, start + frames):
+        game.advance(1 / 60, InputState(right=(i // 90) % 3 != 2, left=(i // 90) % 3 == 2, space=i % 40 == 0))
+        trace.append(game.observe())
+    return trace
+
+
+def playing_game():
+    game = Game(physics_hz=PHYSICS_HZ, seed=3)
+    game.state = 'PLAYING'
+    return game
+
+
+# A fotografia gravada em bytes e restaurada em outro jogo continua a partida igual
+def test_round_trip():
+    game = playing_game()
+    game.player.health = 1000 # Continua jogando até o fim do teste
+    play(game, 400)
+    data = game.snapshot().to_bytes()
+    expected = play(game, 400, 400)
+
+    other = playing_game()
+    play(other, 50)
+    other.restore(Snapshot.from_bytes(data))
+    assert play(other, 400, 400) == expected
+
+
+# Bytes que não são uma fotografia dão ValueError
+@pytest.mark.parametrize('cut', ['empty', 'header', 'truncated', 'garbage'])
+def test_corrupt_bytes(cut):
+    data = playing_game().snapshot().to_bytes()
+    data = {'empty': b'', 'header': data[:6], 'truncated': data[:len(data) // 2],
+            'garbage': data[:6] + b'\x00' * 40}[cut]
+    with pytest.raises(ValueError):
+        Snapshot.from_bytes(data)
+
+
+# Uma fotografia de outra fase é recusada antes de mexer no jogo
+def test_other_level_leaves_game_untouched():
+    snapshot = playing_game().snapshot()
+    game = Game(physics_hz=PHYSICS_HZ, seed=3, level=JsonLevel({
+        'chunk_size': 800,
+        'platforms': [{'image': 'platform', 'pos': [300, 400]}],
+        'coins': [[300, 350]],
+    }))
+    game.state = 'PLAYING'
+    play(game, 30)
+    before = (game.observe(), dict(game.loaded_chunks), len(game.platforms), len(game.coins),
+              len(game.platform_index), len(game.coin_index))
+    with pytest.raises(ValueError):
+        game.restore(snapshot)
+    assert before == (game.observe(), dict(game.loaded_chunks), len(game.platforms), len(game.coins),
+                      len(game.platform_index), len(game.coin_index))
+    play(game, 30, 30) # O jogo continua rodando
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+# Cache dos textos da tela. Desenhar um texto com screen.draw.text passa pelo
+# renderizador de fontes a cada quadro, mesmo quando a frase é a mesma. Aqui
+# cada frase vira uma superfície uma única vez, guardada pela chave
+# (texto, tamanho da fonte, cor), e as menos usadas são descartadas quando o
+# cache enche (LRU). Telas inteiras de texto (menu, fim de jogo) são montadas
+# em uma única superfície, refeita só quando o conteúdo muda.
+
+CACHE_SIZE = 64 # Quantas superfícies de texto ficam guardadas
+
+# Âncoras (horizontal, vertical) no mesmo formato do ptext do pgzero
+TOPLEFT = (0, 0)
+TOPRIGHT = (1, 0)
+CENTER = (0.5, 0.5)
+
+
+# Função que calcula onde desenhar uma superfície para a âncora ficar em pos
+# (mesmo arredondamento do screen.draw.text)
+def anchored(surface, pos, anchor):
+    width, height = surface.get_size()
+    return int(round(pos[0] - anchor[0] * width)), int(round(pos[1] - anchor[1] * height))
+
+
+# Classe que guarda as superfícies dos textos já desenhados
+class TextCache:
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.surfaces = OrderedDict() # (texto, tamanho, cor) -> superfície, da menos para a mais usada
+
+    # Devolve a superfície de um texto, desenhando só se ainda não estiver no cache
+    def render(self, text, fontsize, color):
+        key = (text, fontsize, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            from pgzero import ptext
+            surface = self.surfaces[key] = ptext.getsurf(text, fontsize=fontsize, color=color)
+            if len(self.surfaces) > self.size:
+                self.surfaces.popitem(last=False) # Descarta o texto usado há mais tempo
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    # Desenha um texto em uma superfície de destino
+    def draw(self, target, text, pos, fontsize, color, anchor=TOPLEFT):
+        surface = self.render(text, fontsize, color)
+        target.blit(surface, anchored(surface, pos, anchor))
+
+
+# Classe de uma tela de texto montada em uma única superfície
+class TextPanel:
+    def __init__(self, cache):
+        self.cache = cache
+        self.key = None # Conteúdo usado na última montagem
+        self.surface = None
+        self.pos = (0, 0) # Onde a superfície montada fica na tela
+
+    # Devolve a superfície e a posição da tela. build() devolve as linhas
+    # (texto, posição, tamanho, cor, âncora) e só é chamada quando a chave muda.
+    def get(self, key, build):
+        if self.surface is None or key != self.key:
+            self.surface, self.pos = self.compose(build())
+            self.key = key
+        return self.surface, self.pos
+
+    # Junta as linhas em uma superfície do tamanho da área que elas ocupam
+    def compose(self, lines):
+        import pygame
+        placed = []
+        for text, pos, fontsize, color, anchor in lines:
+            surface = self.cache.render(text, fontsize, color)
+            placed.append((surface, pygame.Rect(anchored(surface, pos, anchor), surface.get_size())))
+        bounds = placed[0][1].unionall([rect for surface, rect in placed[1:]])
+        panel = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 0))
+        for surface, rect in placed:
+            # Soma sobre o fundo zerado copia os pixels exatamente (as linhas não se sobrepõem)
+            panel.blit(surface, (rect.x - bounds.x, rect.y - bounds.y), special_flags=pygame.BLEND_RGBA_ADD)
+        # Codificação RLE: as áreas vazias entre as linhas são puladas no blit, o que
+        # deixa a tela montada mais rápida que desenhar as linhas separadas (as
+        # bordas suavizadas podem diferir em 1 nível de cor por arredondamento)
+        panel.set_alpha(255, pygame.RLEACCEL)
+        return panel, bounds.topleft
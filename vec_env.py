@@ -0,0 +1,252 @@
+import multiprocessing
+import os
+import random
+import sys
+import time
+from multiprocessing import shared_memory
+
+# Ambiente vetorizado no estilo gym: N cópias independentes da simulação
+# (sem janela) rodando em um grupo de processos, para validar fases e treinar
+# bots. Cada processo cuida de uma fatia dos ambientes. As ações, observações,
+# recompensas e fins de episódio ficam em memória compartilhada: a cada passo
+# o processo principal só manda um comando curto para cada processo, e os
+# resultados não são serializados (pickle).
+#
+# Uso:
+#   with VectorEnv(256) as env:
+#       obs = env.reset()
+#       obs, rewards, dones = env.step(actions) # actions: bits LEFT | RIGHT | SPACE
+#
+# Para medir quantos passos por segundo cada número de processos consegue:
+#   python vec_env.py 256 500
+
+try:
+    import numpy as np
+except ImportError: # NumPy só é necessário para o ambiente vetorizado
+    np = None
+
+from simulation import Game, InputState
+from replay import LEFT, RIGHT, SPACE
+
+# Colunas da observação: x, y, velocidade vertical, vida, pontos, estado
+OBS_SIZE = 6
+STATE_CODES = {'MENU': 0, 'PLAYING': 1, 'GAME_OVER': 2, 'WIN': 3}
+
+STEP_DT = 1 / 60 # Tempo simulado em cada passo
+MAX_EPISODE_STEPS = 3600 # Passos até o episódio acabar por tempo (1 minuto de jogo)
+WIN_REWARD = 100 # Recompensa extra por chegar na plataforma final
+HURT_PENALTY = 10 # Penalidade por vida perdida
+
+# Teclas de cada combinação de bits, calculadas uma vez
+ACTIONS = [InputState(bool(mask & LEFT), bool(mask & RIGHT), bool(mask & SPACE)) for mask in range(8)]
+
+
+# Função que cria as visões (arrays do NumPy) sobre o bloco de memória compartilhada
+def shared_arrays(buffer, num_envs):
+    offset = 0
+    arrays = {}
+    for name, dtype, shape in (('obs', np.float64, (num_envs, OBS_SIZE)),
+                               ('rewards', np.float64, (num_envs,)),
+                               ('dones', np.bool_, (num_envs,)),
+                               ('actions', np.uint8, (num_envs,))):
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+
+# Função que calcula o tamanho do bloco de memória compartilhada
+def shared_size(num_envs):
+    return num_envs * (OBS_SIZE * 8 + 8 + 1 + 1)
+
+
+# Classe que roda uma fatia dos ambientes (dentro de um processo do grupo, ou
+# no próprio processo quando num_workers=0)
+class EnvSlice:
+    def __init__(self, arrays, start, stop, seed, dt, max_steps, game_options):
+        self.arrays = arrays
+        self.start = start
+        self.stop = stop
+        self.dt = dt
+        self.max_steps = max_steps
+        self.game_options = game_options
+        # Cada ambiente tem o próprio sorteador de sementes dos episódios
+        self.seeders = [random.Random(seed + i) for i in range(start, stop)]
+        self.games = [None] * (stop - start)
+        self.steps = [0] * (stop - start)
+
+    # Começa um episódio novo no ambiente j da fatia, já jogando
+    def reset_env(self, j):
+        seed = self.seeders[j].randrange(2 ** 32)
+        game = self.games[j]
+        if game is None:
+            game = self.games[j] = Game(seed=seed, **self.game_options)
+        else:
+            game.__init__(seed=seed)
+        game.state = 'PLAYING'
+        self.steps[j] = 0
+        self.write_obs(j, game)
+
+    def write_obs(self, j, game):
+        player = game.player
+        row = self.arrays['obs'][self.start + j]
+        row[0] = player.actor.x
+        row[1] = player.actor.y
+        row[2] = player.velocity_y
+        row[3] = player.health
+        row[4] = player.score
+        row[5] = STATE_CODES[game.state]
+
+    def reset(self):
+        for j in range(len(self.games)):
+            self.reset_env(j)
+        self.arrays['rewards'][self.start:self.stop] = 0
+        self.arrays['dones'][self.start:self.stop] = False
+
+    # Avança cada ambiente um passo com a ação do array compartilhado.
+    # Episódios que acabam são reiniciados na hora (como nos ambientes
+    # vetorizados do gym); a observação devolvida já é a do episódio novo.
+    def step(self):
+        actions = self.arrays['actions']
+        rewards = self.arrays['rewards']
+        dones = self.arrays['dones']
+        dt = self.dt
+        for j, game in enumerate(self.games):
+            i = self.start + j
+            player = game.player
+            score, health = player.score, player.health
+            game.step(dt, ACTIONS[actions[i] & 7])
+            self.steps[j] += 1
+            reward = player.score - score - HURT_PENALTY * (health - player.health)
+            done = game.state != 'PLAYING' or self.steps[j] >= self.max_steps
+            if game.state == 'WIN':
+                reward += WIN_REWARD
+            rewards[i] = reward
+            dones[i] = done
+            if done:
+                self.reset_env(j)
+            else:
+                self.write_obs(j, game)
+
+
+# Função executada em cada processo do grupo: liga-se à memória compartilhada
+# e atende os comandos do processo principal
+def worker(conn, shm_name, num_envs, start, stop, seed, dt, max_steps, game_options):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        envs = EnvSlice(shared_arrays(shm.buf, num_envs), start, stop, seed, dt, max_steps, game_options)
+        while True:
+            command = conn.recv()
+            if command == 'step':
+                envs.step()
+            elif command == 'reset':
+                envs.reset()
+            elif command == 'close':
+                break
+            conn.send(None)
+    finally:
+        envs = None # Solta as visões antes de fechar a memória
+        shm.close()
+
+
+# Classe do ambiente vetorizado
+class VectorEnv:
+    def __init__(self, num_envs, num_workers=None, seed=0, dt=STEP_DT,
+                 max_steps=MAX_EPISODE_STEPS, **game_options):
+        if np is None:
+            raise ImportError("VectorEnv requires numpy")
+        self.num_envs = num_envs
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        self.num_workers = min(num_workers, num_envs)
+        self.shm = shared_memory.SharedMemory(create=True, size=shared_size(num_envs))
+        self.arrays = shared_arrays(self.shm.buf, num_envs)
+        self.connections = []
+        self.processes = []
+        self.local = None
+
+        if self.num_workers == 0:
+            # Sem processos extras: tudo roda aqui (útil para depurar)
+            self.local = EnvSlice(self.arrays, 0, num_envs, seed, dt, max_steps, game_options)
+            return
+
+        # Divide os ambientes em fatias de tamanho parecido, uma por processo
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        bounds = [num_envs * k // self.num_workers for k in range(self.num_workers + 1)]
+        for start, stop in zip(bounds, bounds[1:]):
+            parent, child = context.Pipe()
+            process = context.Process(target=worker, daemon=True,
+                                      args=(child, self.shm.name, num_envs, start, stop,
+                                            seed, dt, max_steps, game_options))
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    # Manda um comando para todos os processos e espera todos terminarem
+    def broadcast(self, command):
+        if self.local is not None:
+            getattr(self.local, command)()
+            return
+        for conn in self.connections:
+            conn.send(command)
+        for conn in self.connections:
+            conn.recv()
+
+    # Começa um episódio novo em todos os ambientes e devolve as observações
+    def reset(self):
+        self.broadcast('reset')
+        return self.arrays['obs'].copy()
+
+    # Avança todos os ambientes um passo. actions tem um número por ambiente
+    # com os bits LEFT, RIGHT e SPACE. Devolve observações, recompensas e fins.
+    def step(self, actions):
+        self.arrays['actions'][:] = actions
+        self.broadcast('step')
+        return self.arrays['obs'].copy(), self.arrays['rewards'].copy(), self.arrays['dones'].copy()
+
+    def close(self):
+        if self.shm is None:
+            return
+        for conn in self.connections:
+            conn.send('close')
+        for process in self.processes:
+            process.join()
+        self.arrays = None
+        self.local = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Função que mede passos de ambiente por segundo com ações aleatórias
+def benchmark(num_envs, steps, num_workers):
+    rng = np.random.default_rng(0)
+    with VectorEnv(num_envs, num_workers=num_workers) as env:
+        env.reset()
+        actions = rng.integers(0, 8, size=(steps, num_envs), dtype=np.uint8)
+        start = time.perf_counter()
+        for t in range(steps):
+            env.step(actions[t])
+        elapsed = time.perf_counter() - start
+    return num_envs * steps / elapsed
+
+
+if __name__ == '__main__':
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    cores = os.cpu_count() or 1
+    base = None
+    workers = 1
+    while True:
+        rate = benchmark(num_envs, steps, workers)
+        base = base or rate
+        print(f"{workers:>3} workers: {rate:>10.0f} env steps/s ({rate / base:.2f}x)")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)